@@ -0,0 +1,52 @@
+from langchain_core.prompts import ChatPromptTemplate
+from ..llm import get_llm
+from ..models import AgentState, AnswerEvaluation, NextAction
+from ..prompts import ASSESS_PROMPT
+from ..context import evaluation_digest, log_tokens
+from ..structured import extract_json, parse_structured
+from .evaluation import retrieve_evaluation_context, save_evaluation
+import asyncio
+
+llm = get_llm("llama-3.3-70b")
+
+# Parsed once at import, not on every call
+prompt = ChatPromptTemplate.from_template(ASSESS_PROMPT)
+chain = prompt | llm
+
+async def assess_agent(state: AgentState):
+    """
+    Scores the last answer and picks the next step in a single call
+    (replaces evaluation + the strategy LLM call when GRAPH_MERGED_ASSESS=1).
+    """
+    history = state.history
+    if len(history) < 2 or history[-1]["role"] != "human":
+        return {}
+
+    context = state.evaluation_context
+    if context is None:
+        context = await retrieve_evaluation_context(state)
+
+    inputs = {
+        "context": context,
+        "question": history[-2]["content"],
+        "answer": history[-1]["content"],
+        "topic": state.topic,
+        "strictness": state.strictness_level,
+        "num_questions": len(history) // 2,
+        "scores": evaluation_digest(state.evaluations[-3:])
+    }
+    response = await chain.ainvoke(inputs)
+    log_tokens("assess", response, inputs)
+
+    # Scores and action are validated separately, so only the part that failed is repaired
+    # (both repairs run concurrently). Without an action, strategy decides on its own.
+    data = extract_json(response.content)
+    scores, action = await asyncio.gather(
+        parse_structured(response.content, AnswerEvaluation, "assess scores", data),
+        parse_structured(response.content, NextAction, "assess action", data)
+    )
+    analysis = scores.model_dump() if scores else {"feedback": "Error parsing evaluation."}
+    next_action = action.next_action if action else None
+    await save_evaluation(state, analysis)
+
+    return {"evaluations": [analysis], "next_action": next_action, "evaluation_context": None}
@@ -1,14 +1,60 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_cerebras import ChatCerebras
-from ..models import AgentState
+from ..llm import get_llm
+from ..models import AgentState, AnswerEvaluation
+from ..structured import parse_structured
 from ..prompts import EVALUATION_PROMPT
 from ..rag import retrieve_context
-import os
-import json
+from ..scoring import scoring_queue
+from ..speculation import speculator
 
-llm = ChatCerebras(api_key=os.getenv("CEREBRAS_API_KEY"), model="llama-3.3-70b")
+llm = get_llm("llama-3.3-70b")
 
-def evaluation_agent(state: AgentState):
+# Parsed once at import, not on every call
+prompt = ChatPromptTemplate.from_template(EVALUATION_PROMPT)
+chain = prompt | llm
+
+def build_evaluation_query(state: AgentState) -> str:
+    history = state.history
+    # Construct a query from the question and answer to find relevant knowledge
+    return f"{history[-2]['content']}\n{history[-1]['content']}"
+
+async def fetch_evaluation_context(query: str, session_id: str) -> str:
+    docs = await retrieve_context(query, session_id=session_id)
+    return "\n\n".join([doc.page_content for doc in docs]) if docs else "No specific context retrieved."
+
+async def retrieve_evaluation_context(state: AgentState) -> str:
+    query = build_evaluation_query(state)
+    # May already be running since the answer was transcribed
+    context = await speculator.take(state.session_id, "evaluation", query)
+    if context is not None:
+        return context
+    return await fetch_evaluation_context(query, state.session_id)
+
+async def save_evaluation(state: AgentState, analysis: dict):
+    """
+    Persists the scores of the current answer.
+    """
+    if not state.current_answer_id:
+        return
+    try:
+        from ..db import get_async_supabase
+        supabase = await get_async_supabase()
+        eval_data = {
+            "answer_id": state.current_answer_id,
+            # "score": 0, # Not in schema, removing placeholder
+            "feedback_text": analysis.get("feedback_text") or analysis.get("feedback", ""),
+            "concept_correctness_score": analysis.get("concept_correctness", 0),
+            "clarity_score": analysis.get("clarity", 0),
+            "completeness_score": analysis.get("completeness", 0),
+            "confidence_score_eval": analysis.get("confidence", 0), 
+            "follow_up_handling_score": analysis.get("handling", 0),
+            "improved_answer_example": analysis.get("improved_answer")
+        }
+        await supabase.table("evaluations").insert(eval_data).execute()
+    except Exception as e:
+        print(f"Error saving evaluation: {e}")
+
+async def evaluation_agent(state: AgentState):
     """
     Evaluates the last answer.
     """
@@ -20,44 +66,33 @@ def evaluation_agent(state: AgentState):
     question = history[-2]["content"]
     answer = history[-1]["content"]
     
-    # Context retrieval
-    # Construct a query from the question and answer to find relevant knowledge
-    retrieval_query = f"{question}\n{answer}"
-    docs = retrieve_context(retrieval_query, session_id=state.session_id)
-    context = "\n\n".join([doc.page_content for doc in docs]) if docs else "No specific context retrieved." 
+    # Context may already have been fetched in parallel with the answer analysis
+    context = state.evaluation_context
+    if context is None:
+        context = await retrieve_evaluation_context(state)
 
-    prompt = ChatPromptTemplate.from_template(EVALUATION_PROMPT)
-    chain = prompt | llm
     
-    response = chain.invoke({
+    response = await chain.ainvoke({
         "context": context,
         "question": question,
         "answer": answer
     })
     
-    try:
-        analysis = json.loads(response.content)
-    except:
-        analysis = {"feedback": "Error parsing evaluation."}
-
-    # Persist Evaluation
-    if state.current_answer_id:
-        try:
-            from ..db import supabase
-            eval_data = {
-                "answer_id": state.current_answer_id,
-                # "score": 0, # Not in schema, removing placeholder
-                "feedback_text": analysis.get("feedback", ""),
-                "concept_correctness_score": analysis.get("concept_correctness", 0),
-                "clarity_score": analysis.get("clarity", 0),
-                "completeness_score": analysis.get("completeness", 0),
-                "confidence_score_eval": analysis.get("confidence", 0), 
-                "follow_up_handling_score": analysis.get("handling", 0)
-            }
-            supabase.table("evaluations").insert(eval_data).execute()
-        except Exception as e:
-            print(f"Error saving evaluation: {e}")
+    parsed = await parse_structured(response.content, AnswerEvaluation, "evaluation")
+    analysis = parsed.model_dump() if parsed else {"feedback": "Error parsing evaluation."}
+
+    await save_evaluation(state, analysis)
 
     # Append to state evaluations if needed or just return last
     # The graph usually merges, but let's be safe and just return the new list item
-    return {"evaluations": [analysis]}
+    return {"evaluations": [analysis], "evaluation_context": None}
+
+async def score_dispatch_agent(state: AgentState):
+    """
+    Queues the answer for background scoring (GRAPH_ASYNC_SCORING=1), strategy collects the result.
+    """
+    history = state.history
+    if state.interview_complete or len(history) < 2 or history[-1]["role"] != "human":
+        return {}
+    scoring_queue.submit(state.session_id, evaluation_agent, state)
+    return {}
@@ -1,6 +1,5 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_cerebras import ChatCerebras
-from langchain_groq import ChatGroq
+from ..llm import get_llm
 from ..models import AgentState
 from ..prompts import (
     EXAMINER_PERSONA_EASY, 
@@ -10,12 +9,37 @@ from ..prompts import (
     EXAMINER_PERSONA_LISTENER
 )
 from ..rag import retrieve_context
-import os
+from ..context import render_history, log_tokens
+from ..speculation import speculator
 
 # Initialize LLM
-# Using Cerebras as primary for interviewing as requested
-llm = ChatCerebras(api_key=os.getenv("CEREBRAS_API_KEY"), model="llama3.1-8b") 
-# Fallback or alternative if Cerebras has issues: ChatGroq(model="llama3-8b-8192")
+# Using Cerebras as primary for interviewing as requested, the gateway fails over to Groq
+llm = get_llm("llama3.1-8b")
+
+# Parsed once at import, not on every call
+prompt = ChatPromptTemplate.from_template(EXAMINER_PROMPT)
+chain = prompt | llm
+
+def build_examiner_query(state: AgentState) -> str:
+    # Retrieve context based on topic and recent history to ground the question
+    query = f"{state.topic}"
+    if state.history:
+         # Include the last answer to find relevant follow-up context
+         query += f" {state.history[-1]['content']}"
+    return query
+
+async def fetch_examiner_context(query: str, session_id: str) -> str:
+    print(f"[EXAMINER] Using RAG query: '{query}'")
+    docs = await retrieve_context(query, k=5, session_id=session_id)
+    return "\n\n".join([doc.page_content for doc in docs]) if docs else "General Knowledge"
+
+async def retrieve_examiner_context(state: AgentState) -> str:
+    query = build_examiner_query(state)
+    # May already be running since the answer was transcribed
+    context = await speculator.take(state.session_id, "examiner", query)
+    if context is not None:
+        return context
+    return await fetch_examiner_context(query, state.session_id)
 
 def get_persona_instructions(strictness: str):
     if strictness.lower() == "easy":
@@ -25,25 +49,19 @@ def get_persona_instructions(strictness: str):
     else:
         return EXAMINER_PERSONA_MODERATE
 
-def examiner_agent(state: AgentState):
+async def examiner_agent(state: AgentState):
     """
     Generates the next question.
     """
     topic = state.topic
     strictness = state.strictness_level
-    history = state.history
-    
-    # Retrieve context based on topic and recent history to ground the question
-    query = f"{topic}"
-    if history:
-         # Include the last answer to find relevant follow-up context
-         query += f" {history[-1]['content']}"
     
     print(f"[EXAMINER] Generating question for topic: '{topic}'")
-    print(f"[EXAMINER] Using RAG query: '{query}'")
-    
-    docs = retrieve_context(query, k=5, session_id=state.session_id)
-    context = "\n\n".join([doc.page_content for doc in docs]) if docs else "General Knowledge"
+
+    # Context may already have been fetched in parallel with the answer analysis
+    context = state.examiner_context
+    if context is None:
+        context = await retrieve_examiner_context(state)
 
     persona = get_persona_instructions(strictness)
     
@@ -51,31 +69,32 @@ def examiner_agent(state: AgentState):
     if state.mode == "presentation" and state.presentation_stage == "speaking":
         persona = EXAMINER_PERSONA_LISTENER
     
-    prompt = ChatPromptTemplate.from_template(EXAMINER_PROMPT)
-    chain = prompt | llm
-    
-    response = chain.invoke({
+    inputs = {
         "context": context,
         "topic": topic,
         "strictness": strictness,
-        "history": history,
+        # Rolling summary + last few turns, not the whole transcript
+        "history": render_history(state),
         "persona_instructions": persona,
         "mastery": state.topic_mastery,
         "stage": state.interview_stage
-    })
+    }
+    response = await chain.ainvoke(inputs)
+    log_tokens("examiner", response, inputs)
     
     question_text = response.content
     
     # Persist Question to DB
     try:
-        from ..db import supabase
+        from ..db import get_async_supabase
+        supabase = await get_async_supabase()
         q_data = {
             "session_id": state.session_id,
             "question_text": question_text,
             "question_order": state.current_question_index + 1,
             "concept_focus": topic # Can be refined later
         }
-        res = supabase.table("questions").insert(q_data).execute()
+        res = await supabase.table("questions").insert(q_data).execute()
         question_id = res.data[0]["id"]
     except Exception as e:
         print(f"Error saving question: {e}")
@@ -84,5 +103,6 @@ def examiner_agent(state: AgentState):
     return {
         "history": [{"role": "ai", "content": question_text}],
         "current_question_index": state.current_question_index + 1,
-        "current_question_id": question_id
+        "current_question_id": question_id,
+        "examiner_context": None
     }
@@ -1,14 +1,13 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_cerebras import ChatCerebras
-from ..models import AgentState
-import os
+from ..llm import get_llm
+from ..models import AgentState, FeedbackReport
+from ..structured import parse_structured
+from ..context import render_history, evaluation_digest, log_tokens
 
-llm = ChatCerebras(api_key=os.getenv("CEREBRAS_API_KEY"), model="llama-3.3-70b")
+# Same session state -> same prompt, so a retried /api/end reuses the first report
+llm = get_llm("llama-3.3-70b", memoize=True)
 
 FEEDBACK_PROMPT = """Generate detailed feedback for the student based on the viva performance.
-Topic: {topic}
-Scores: {scores}
-Transcript History: {history}
 
 Analyze the session and provide a structured JSON output with the following schema:
 {{
@@ -23,9 +22,17 @@ Analyze the session and provide a structured JSON output with the following sche
 }}
 
 Ensure the JSON is valid and strictly follows the schema. Do not include markdown formatting (like ```json) in the response, just the raw JSON.
+
+Topic: {topic}
+Scores: {scores}
+Transcript History: {history}
 """
 
-def feedback_agent(state: AgentState):
+# Parsed once at import, not on every call
+prompt = ChatPromptTemplate.from_template(FEEDBACK_PROMPT)
+chain = prompt | llm
+
+async def feedback_agent(state: AgentState):
     """
     Generates final feedback.
     """
@@ -33,13 +40,15 @@ def feedback_agent(state: AgentState):
     if not state.interview_complete:
         return {}
 
-    prompt = ChatPromptTemplate.from_template(FEEDBACK_PROMPT)
-    chain = prompt | llm
     
-    response = chain.invoke({
+    inputs = {
         "topic": state.topic,
-        "scores": str(state.evaluations),
-        "history": str(state.history)
-    })
-    
-    return {"feedback_summary": response.content}
+        "scores": evaluation_digest(state.evaluations),
+        "history": render_history(state)
+    }
+    response = await chain.ainvoke(inputs)
+    log_tokens("feedback", response, inputs)
+
+    # Always hand the frontend clean JSON, raw text only if it could not be salvaged
+    report = await parse_structured(response.content, FeedbackReport, "feedback")
+    return {"feedback_summary": report.model_dump_json() if report else response.content}
@@ -1,8 +1,8 @@
 from ..models import AgentState
-from ..db import supabase
+from ..db import get_async_supabase
 import json
 
-def memory_agent(state: AgentState):
+async def memory_agent(state: AgentState):
     """
     Saves the session updates to Supabase.
     """
@@ -12,6 +12,9 @@ def memory_agent(state: AgentState):
     if state.evaluations:
         latest_eval = state.evaluations[-1]
         try:
+             # Inside the try: a Supabase outage is logged, it must not fail the graph turn
+             supabase = await get_async_supabase()
+
              # Calculate session score
              total_score = 0
              count = 0
@@ -29,14 +32,14 @@ def memory_agent(state: AgentState):
              final_avg = round(total_score / count, 2) if count > 0 else 0.0
              
              if state.interview_complete:
-                 supabase.table("sessions").update({
+                 await supabase.table("sessions").update({
                      "final_score": final_avg,
                      "feedback_summary": state.feedback_summary or ""
                  }).eq("id", session_id).execute()
                  
                  # UPDATE TOPIC MASTERY
                  # Fetch existing
-                 user_id_resp = supabase.table("sessions").select("user_id").eq("id", session_id).execute()
+                 user_id_resp = await supabase.table("sessions").select("user_id").eq("id", session_id).execute()
                  if user_id_resp.data:
                     user_id = user_id_resp.data[0]["user_id"]
                     topic = state.topic
@@ -45,20 +48,20 @@ def memory_agent(state: AgentState):
                     # Mastery is 0-100. Score is 0-10.
                     # new_mastery = (old_mastery + (score * 10)) / 2
                     
-                    mastery_resp = supabase.table("topic_mastery").select("mastery_level").eq("user_id", user_id).eq("topic", topic).execute()
+                    mastery_resp = await supabase.table("topic_mastery").select("mastery_level").eq("user_id", user_id).eq("topic", topic).execute()
                     
                     if mastery_resp.data:
                         old_mastery = mastery_resp.data[0]["mastery_level"]
                         new_mastery = int((old_mastery + (final_avg * 10)) / 2)
                         
-                        supabase.table("topic_mastery").update({
+                        await supabase.table("topic_mastery").update({
                             "mastery_level": new_mastery,
                             "last_updated": "now()"
                         }).eq("user_id", user_id).eq("topic", topic).execute()
                     else:
                         # Create new
                         new_mastery = int(final_avg * 10)
-                        supabase.table("topic_mastery").insert({
+                        await supabase.table("topic_mastery").insert({
                             "user_id": user_id,
                             "topic": topic,
                             "mastery_level": new_mastery
@@ -0,0 +1,23 @@
+from ..models import AgentState
+from .examiner import retrieve_examiner_context
+from .evaluation import retrieve_evaluation_context
+
+def _has_new_answer(state: AgentState) -> bool:
+    history = state.history
+    return not state.interview_complete and len(history) >= 2 and history[-1]["role"] == "human"
+
+async def evaluation_retrieval_agent(state: AgentState):
+    """
+    Fetches the evaluation context as soon as the answer arrives.
+    """
+    if not _has_new_answer(state):
+        return {}
+    return {"evaluation_context": await retrieve_evaluation_context(state)}
+
+async def examiner_retrieval_agent(state: AgentState):
+    """
+    Fetches the next question's context while the answer is still being evaluated.
+    """
+    if not _has_new_answer(state):
+        return {}
+    return {"examiner_context": await retrieve_examiner_context(state)}
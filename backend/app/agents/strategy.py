@@ -1,12 +1,37 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_cerebras import ChatCerebras
+from ..llm import get_llm
 from ..models import AgentState
 from ..prompts import STRATEGY_PROMPT
-import os
+from ..policy import STRATEGY_MODE, min_questions, decide, record_decision
+from ..scoring import scoring_queue
+from ..context import evaluation_digest, log_tokens
 
-llm = ChatCerebras(api_key=os.getenv("CEREBRAS_API_KEY"), model="llama-3.3-70b") # Using 70B for reasoning
+llm = get_llm("llama-3.3-70b") # Using 70B for reasoning
 
-def strategy_agent(state: AgentState):
+# Parsed once at import, not on every call
+prompt = ChatPromptTemplate.from_template(STRATEGY_PROMPT)
+chain = prompt | llm
+
+async def strategy_agent(state: AgentState):
+    """
+    Decides the next action, after merging in any answer scores finished in the background.
+    """
+    # Only block on outstanding scores when the decision or the final feedback needs them
+    needs_scores = (state.interview_complete or STRATEGY_MODE == "llm"
+                    or len(state.history) // 2 >= min_questions(state.mode))
+    new_scores = await scoring_queue.collect(state.session_id, wait=needs_scores)
+    if new_scores:
+        state = state.model_copy(update={"evaluations": state.evaluations + new_scores})
+
+    result = await choose_next_step(state)
+
+    if result.get("interview_complete") and scoring_queue.pending(state.session_id):
+        new_scores += await scoring_queue.collect(state.session_id, wait=True)
+    if new_scores:
+        result = {**result, "evaluations": new_scores}
+    return result
+
+async def choose_next_step(state: AgentState):
     """
     Decides the next action.
     """
@@ -74,23 +99,37 @@ def strategy_agent(state: AgentState):
                 "presentation_stage": "speaking"
             }
 
-    prompt = ChatPromptTemplate.from_template(STRATEGY_PROMPT)
-    chain = prompt | llm
-    
     # Calculate number of questions asked
     num_questions = len(history) // 2
 
-    response = chain.invoke({
-        "history": str(history[-2:]) if history else "Start",
-        "num_questions": num_questions,
-        "scores": str(scores[-1]) if scores else "None",
-        "topic": topic,
-        "strictness": strictness
-    })
-    
-    decision = response.content.strip().lower()
+    # An action chosen by the merged assess call wins, it was paid for with the scores.
+    # Otherwise rules settle most turns and the 70B model only sees the ambiguous ones.
+    decision = None
+    if not state.next_action and STRATEGY_MODE != "llm":
+        decision = decide(num_questions, scores, state.confidence_metrics, strictness, state.mode)
+        if decision is None and STRATEGY_MODE == "rules":
+            decision = ("ask_new_question", "ambiguous, LLM disabled")
+
+    if state.next_action:
+        action = state.next_action
+        record_decision(action, "assess", "suggested with the scores")
+    elif decision:
+        action, reason = decision
+        record_decision(action, "rules", reason)
+    else:
+        inputs = {
+            "history": str(history[-2:]) if history else "Start",
+            "num_questions": num_questions,
+            "scores": evaluation_digest(scores[-3:]),
+            "topic": topic,
+            "strictness": strictness
+        }
+        response = await chain.ainvoke(inputs)
+        log_tokens("strategy", response, inputs)
+        action = response.content.strip().lower()
+        record_decision(action, "llm", "ambiguous scores")
     
-    if "end_interview" in decision:
+    if "end_interview" in action:
         return {"interview_complete": True}
     
     # Check Stage Transition
@@ -0,0 +1,41 @@
+from langchain_core.prompts import ChatPromptTemplate
+from ..llm import get_llm
+from ..models import AgentState
+from ..prompts import SUMMARY_PROMPT
+from ..context import verbatim_start, format_messages, log_tokens
+
+# Small model, the summary only has to track what was asked and how it went
+llm = get_llm("llama3.1-8b")
+
+# Parsed once at import, not on every call
+prompt = ChatPromptTemplate.from_template(SUMMARY_PROMPT)
+chain = prompt | llm
+
+async def history_summary_agent(state: AgentState):
+    """
+    Folds turns that left the verbatim window into the rolling history summary.
+    """
+    history = state.history
+    fold_until = verbatim_start(history)
+    if state.interview_complete or fold_until <= state.summarized_until:
+        return {}
+
+    inputs = {
+        "topic": state.topic,
+        "summary": state.history_summary or "None yet",
+        "turns": format_messages(history[state.summarized_until:fold_until])
+    }
+
+    try:
+        response = await chain.ainvoke(inputs)
+    except Exception as e:
+        # Unsummarized turns stay verbatim in prompts, the next answer retries
+        print(f"[SUMMARY] Error updating history summary: {e}")
+        return {}
+    log_tokens("history_summary", response, inputs)
+
+    print(f"[SUMMARY] Folded messages {state.summarized_until}-{fold_until} into the summary")
+    return {
+        "history_summary": response.content.strip(),
+        "summarized_until": fold_until
+    }
@@ -0,0 +1,141 @@
+"""
+Content-addressed cache for synthesized speech.
+
+Clips are keyed by (voice, whitespace-normalized text), so repeated persona phrases
+and recurring questions are synthesized once. Hot clips stay in a small in-memory
+LRU tier, everything else lives in a disk tier with a byte budget and
+least-recently-used eviction (file mtime is refreshed on every read). Workers sharing
+TTS_CACHE_DIR see each other's clips, so the directory is rescanned before evicting
+and every TTS_CACHE_RESCAN_PUTS writes, keeping the byte budget for the whole directory
+(between scans each worker can overshoot it by at most that many clips).
+"""
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "/tmp/vivagraph/tts")
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024)))
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+TTS_CACHE_RESCAN_PUTS = int(os.getenv("TTS_CACHE_RESCAN_PUTS", "32"))
+
+
+def clip_key(voice: str, text: str) -> str:
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{voice}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    def __init__(self, directory: str, memory_bytes: int, disk_bytes: int):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = None  # key -> size, loaded lazily
+        self._disk_size = 0
+        self._puts_since_scan = 0
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _load_disk_index(self, rescan: bool = False):
+        if self._disk is not None and not rescan:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".mp3"):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        self._disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._disk_size = sum(self._disk.values())
+        self._puts_since_scan = 0
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return data
+
+            self._load_disk_index()
+            if key in self._disk:
+                try:
+                    with open(self._path(key), "rb") as f:
+                        data = f.read()
+                    os.utime(self._path(key))
+                    self._disk.move_to_end(key)
+                    self._remember(key, data)
+                    self.stats["disk_hits"] += 1
+                    return data
+                except FileNotFoundError:
+                    # Evicted by another worker sharing the directory
+                    self._disk_size -= self._disk.pop(key)
+
+            self.stats["misses"] += 1
+            return None
+
+    def _put(self, key: str, data: bytes):
+        if not data:
+            return
+        with self._lock:
+            self._remember(key, data)
+            self._load_disk_index()
+            if key in self._disk:
+                return
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._disk[key] = len(data)
+            self._disk_size += len(data)
+            self._puts_since_scan += 1
+            # Other workers write to the same directory, evict against its real contents
+            if self._disk_size > self.disk_bytes or self._puts_since_scan >= TTS_CACHE_RESCAN_PUTS:
+                self._load_disk_index(rescan=True)
+            while self._disk_size > self.disk_bytes and self._disk:
+                evicted, size = self._disk.popitem(last=False)
+                self._disk_size -= size
+                try:
+                    os.remove(self._path(evicted))
+                except FileNotFoundError:
+                    pass
+
+    async def get(self, voice: str, text: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get, clip_key(voice, text))
+
+    async def put(self, voice: str, text: str, data: bytes):
+        await asyncio.to_thread(self._put, clip_key(voice, text), data)
+
+    def get_metrics(self) -> dict:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_bytes": self._memory_size,
+            "disk_bytes": self._disk_size,
+        }
+
+
+audio_cache = AudioCache(TTS_CACHE_DIR, TTS_CACHE_MEMORY_BYTES, TTS_CACHE_DISK_BYTES)
@@ -0,0 +1,429 @@
+"""
+Durable LangGraph checkpointer shared by every API worker.
+
+The backend is picked with CHECKPOINT_BACKEND:
+- "sqlite" (default): WAL-mode SQLite file, safe for several workers on one host.
+- "postgres": shared Postgres database (CHECKPOINT_URL), for multiple replicas.
+  Requires `langgraph-checkpoint-postgres` and `psycopg[binary,pool]`.
+- "memory": process-local store, only for single-worker development.
+
+Checkpoints are msgpack-encoded and zlib-compressed, the latest checkpoint of recently
+active threads is kept in a bounded LRU cache, and threads expire after
+CHECKPOINT_TTL_SECONDS of inactivity (CHECKPOINT_FINISHED_TTL_SECONDS once the
+interview is complete).
+"""
+import asyncio
+import os
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite").lower()
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "/tmp/vivagraph/checkpoints.sqlite")
+CHECKPOINT_URL = os.getenv("CHECKPOINT_URL")
+CHECKPOINT_CACHE_SIZE = int(os.getenv("CHECKPOINT_CACHE_SIZE", "256"))
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(6 * 60 * 60)))
+CHECKPOINT_FINISHED_TTL_SECONDS = int(os.getenv("CHECKPOINT_FINISHED_TTL_SECONDS", "600"))
+CHECKPOINT_SWEEP_SECONDS = int(os.getenv("CHECKPOINT_SWEEP_SECONDS", "300"))
+
+# Payloads smaller than this are stored as-is, compression only pays off on bigger states
+COMPRESSION_MIN_BYTES = 512
+
+
+class CompressedSerializer:
+    """
+    Wraps a LangGraph serializer and zlib-compresses large payloads.
+    The type tag gets a "+z" suffix so uncompressed rows stay readable.
+    """
+    def __init__(self, serde=None, level: int = 6):
+        self.serde = serde or JsonPlusSerializer()
+        self.level = level
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        if len(data) >= COMPRESSION_MIN_BYTES:
+            return f"{type_}+z", zlib.compress(data, self.level)
+        return type_, data
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith("+z"):
+            return self.serde.loads_typed((type_[:-2], zlib.decompress(payload)))
+        return self.serde.loads_typed((type_, payload))
+
+
+class _MemoryStore:
+    """Process-local checkpoints. Expiry is tracked in a dict."""
+    shared = False
+
+    def __init__(self, serde):
+        self.serde = serde
+        self.saver = InMemorySaver(serde=serde)
+        self.expiry = {}
+
+    async def open(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+    async def latest_checkpoint_id(self, thread_id: str) -> Optional[str]:
+        return None
+
+    async def set_expiry(self, thread_id: str, expires_at: float):
+        self.expiry[thread_id] = expires_at
+
+    async def expired_threads(self, now: float) -> list:
+        return [t for t, exp in self.expiry.items() if exp < now]
+
+    async def forget(self, thread_id: str):
+        self.expiry.pop(thread_id, None)
+
+
+class _SqliteStore:
+    """SQLite file in WAL mode, shared by all workers on the same host."""
+    shared = True
+
+    def __init__(self, serde, path: str):
+        self.serde = serde
+        self.path = path
+        self.conn = None
+        self.saver = None
+
+    async def open(self):
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = await aiosqlite.connect(self.path)
+        self.saver = AsyncSqliteSaver(self.conn, serde=self.serde)
+        await self.saver.setup()
+        async with self.saver.lock:
+            await self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint_expiry (thread_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+            )
+            await self.conn.commit()
+
+    async def aclose(self):
+        # aiosqlite runs a non-daemon thread per connection, the process cannot exit while it is open
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+            self.saver = None
+
+    async def latest_checkpoint_id(self, thread_id: str) -> Optional[str]:
+        async with self.saver.lock:
+            async with self.conn.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id,),
+            ) as cur:
+                row = await cur.fetchone()
+        return row[0] if row else None
+
+    async def set_expiry(self, thread_id: str, expires_at: float):
+        async with self.saver.lock:
+            await self.conn.execute(
+                "INSERT INTO checkpoint_expiry (thread_id, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET expires_at = excluded.expires_at",
+                (thread_id, expires_at),
+            )
+            await self.conn.commit()
+
+    async def expired_threads(self, now: float) -> list:
+        async with self.saver.lock:
+            async with self.conn.execute(
+                "SELECT thread_id FROM checkpoint_expiry WHERE expires_at < ?", (now,)
+            ) as cur:
+                rows = await cur.fetchall()
+        return [r[0] for r in rows]
+
+    async def forget(self, thread_id: str):
+        async with self.saver.lock:
+            await self.conn.execute("DELETE FROM checkpoint_expiry WHERE thread_id = ?", (thread_id,))
+            await self.conn.commit()
+
+
+class _PostgresStore:
+    """Postgres database shared by every replica."""
+    shared = True
+
+    def __init__(self, serde, url: str):
+        if not url:
+            raise ValueError("CHECKPOINT_URL must be set when CHECKPOINT_BACKEND=postgres")
+        self.serde = serde
+        self.url = url
+        self.pool = None
+        self.saver = None
+
+    async def open(self):
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool
+
+        self.pool = AsyncConnectionPool(
+            self.url,
+            open=False,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        )
+        await self.pool.open()
+        self.saver = AsyncPostgresSaver(self.pool, serde=self.serde)
+        await self.saver.setup()
+        async with self.pool.connection() as conn:
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint_expiry (thread_id TEXT PRIMARY KEY, expires_at DOUBLE PRECISION NOT NULL)"
+            )
+
+    async def aclose(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            self.saver = None
+
+    async def latest_checkpoint_id(self, thread_id: str) -> Optional[str]:
+        async with self.pool.connection() as conn:
+            cur = await conn.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = '' ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id,),
+            )
+            row = await cur.fetchone()
+        return row["checkpoint_id"] if row else None
+
+    async def set_expiry(self, thread_id: str, expires_at: float):
+        async with self.pool.connection() as conn:
+            await conn.execute(
+                "INSERT INTO checkpoint_expiry (thread_id, expires_at) VALUES (%s, %s) "
+                "ON CONFLICT (thread_id) DO UPDATE SET expires_at = EXCLUDED.expires_at",
+                (thread_id, expires_at),
+            )
+
+    async def expired_threads(self, now: float) -> list:
+        async with self.pool.connection() as conn:
+            cur = await conn.execute("SELECT thread_id FROM checkpoint_expiry WHERE expires_at < %s", (now,))
+            rows = await cur.fetchall()
+        return [r["thread_id"] for r in rows]
+
+    async def forget(self, thread_id: str):
+        async with self.pool.connection() as conn:
+            await conn.execute("DELETE FROM checkpoint_expiry WHERE thread_id = %s", (thread_id,))
+
+
+class CachedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Checkpointer that stores state in a durable backend and keeps the latest
+    checkpoint of recently active threads in an LRU cache.
+
+    With a shared backend another worker may have advanced the thread, so a cache hit
+    is only served after a cheap checkpoint_id probe confirms it is still the latest.
+    The backend is opened lazily on first use (or explicitly via `setup`).
+    """
+    def __init__(self, store, cache_size: int = CHECKPOINT_CACHE_SIZE):
+        super().__init__(serde=store.serde)
+        self.store = store
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, CheckpointTuple]" = OrderedDict()
+        self._open_lock = asyncio.Lock()
+        self._opened = False
+        self._sweeper = None
+        self._evict_hooks = []
+        self.stats = {"hits": 0, "misses": 0, "expired": 0}
+
+    @property
+    def inner(self) -> BaseCheckpointSaver:
+        return self.store.saver
+
+    async def setup(self):
+        if self._opened:
+            return
+        async with self._open_lock:
+            if not self._opened:
+                await self.store.open()
+                self._opened = True
+                print(f"[CHECKPOINT] Using {CHECKPOINT_BACKEND} checkpointer")
+
+    # --- LRU cache ---
+
+    def _cache_get(self, thread_id: str) -> Optional[CheckpointTuple]:
+        cached = self._cache.get(thread_id)
+        if cached:
+            self._cache.move_to_end(thread_id)
+        return cached
+
+    def _cache_put(self, thread_id: str, tup: CheckpointTuple):
+        self._cache[thread_id] = tup
+        self._cache.move_to_end(thread_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _copy(tup: CheckpointTuple) -> CheckpointTuple:
+        # The pregel loop mutates channel_versions / versions_seen in place
+        return tup._replace(checkpoint=copy_checkpoint(tup.checkpoint), pending_writes=list(tup.pending_writes or []))
+
+    @staticmethod
+    def _is_root_ns(config: RunnableConfig) -> bool:
+        return config["configurable"].get("checkpoint_ns", "") == ""
+
+    # --- BaseCheckpointSaver API ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        await self.setup()
+        thread_id = str(config["configurable"]["thread_id"])
+        requested_id = config["configurable"].get("checkpoint_id")
+
+        cached = self._cache_get(thread_id) if self._is_root_ns(config) else None
+        if cached:
+            cached_id = cached.checkpoint["id"]
+            if requested_id:
+                valid = requested_id == cached_id
+            elif self.store.shared:
+                valid = await self.store.latest_checkpoint_id(thread_id) == cached_id
+            else:
+                valid = True
+            if valid:
+                self.stats["hits"] += 1
+                return self._copy(cached)
+
+        self.stats["misses"] += 1
+        tup = await self.inner.aget_tuple(config)
+        if tup and not requested_id and self._is_root_ns(config):
+            self._cache_put(thread_id, self._copy(tup))
+        return tup
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        await self.setup()
+        async for tup in self.inner.alist(config, filter=filter, before=before, limit=limit):
+            yield tup
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self.setup()
+        next_config = await self.inner.aput(config, checkpoint, metadata, new_versions)
+        thread_id = str(config["configurable"]["thread_id"])
+
+        if self._is_root_ns(config):
+            parent_id = config["configurable"].get("checkpoint_id")
+            self._cache_put(thread_id, CheckpointTuple(
+                config=next_config,
+                checkpoint=copy_checkpoint(checkpoint),
+                metadata=get_checkpoint_metadata(config, metadata),
+                parent_config={"configurable": {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": parent_id}} if parent_id else None,
+                pending_writes=[],
+            ))
+            await self.store.set_expiry(thread_id, time.time() + CHECKPOINT_TTL_SECONDS)
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self.setup()
+        # Pending writes change what get_tuple returns, re-read the thread next time
+        self._cache.pop(str(config["configurable"]["thread_id"]), None)
+        await self.inner.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.setup()
+        self._cache.pop(str(thread_id), None)
+        await self.inner.adelete_thread(thread_id)
+        await self.store.forget(str(thread_id))
+
+    def get_next_version(self, current, channel):
+        return self.inner.get_next_version(current, channel)
+
+    # --- Expiry ---
+
+    async def mark_finished(self, thread_id: str):
+        """Shortens the TTL of a completed interview so it is evicted soon."""
+        await self.setup()
+        await self.store.set_expiry(thread_id, time.time() + CHECKPOINT_FINISHED_TTL_SECONDS)
+
+    def on_evict(self, hook):
+        """Registers `hook(thread_id)`, called for every thread the sweeper evicts."""
+        self._evict_hooks.append(hook)
+
+    async def evict_expired(self) -> int:
+        await self.setup()
+        expired = await self.store.expired_threads(time.time())
+        for thread_id in expired:
+            try:
+                await self.adelete_thread(thread_id)
+            except Exception as e:
+                print(f"[CHECKPOINT] Failed to evict thread {thread_id}: {e}")
+                continue
+            # Release per-session state held outside the checkpointer (e.g. the local RAG index)
+            for hook in self._evict_hooks:
+                try:
+                    hook(thread_id)
+                except Exception as e:
+                    print(f"[CHECKPOINT] Eviction hook failed for thread {thread_id}: {e}")
+        if expired:
+            self.stats["expired"] += len(expired)
+            print(f"[CHECKPOINT] Evicted {len(expired)} expired threads")
+        return len(expired)
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(CHECKPOINT_SWEEP_SECONDS)
+            try:
+                await self.evict_expired()
+            except Exception as e:
+                print(f"[CHECKPOINT] Sweep failed: {e}")
+
+    def start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop_sweeper(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    async def aclose(self):
+        """Closes the backend connection, `setup` reopens it."""
+        async with self._open_lock:
+            if self._opened:
+                await self.store.aclose()
+                self._cache.clear()
+                self._opened = False
+
+
+def build_checkpointer() -> CachedCheckpointSaver:
+    serde = CompressedSerializer()
+    if CHECKPOINT_BACKEND == "memory":
+        store = _MemoryStore(serde)
+    elif CHECKPOINT_BACKEND == "sqlite":
+        store = _SqliteStore(serde, CHECKPOINT_DB_PATH)
+    elif CHECKPOINT_BACKEND == "postgres":
+        store = _PostgresStore(serde, CHECKPOINT_URL)
+    else:
+        raise ValueError(f"Unknown CHECKPOINT_BACKEND: {CHECKPOINT_BACKEND}")
+    return CachedCheckpointSaver(store)
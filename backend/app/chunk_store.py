@@ -0,0 +1,84 @@
+"""
+Persistent content-addressed chunk embedding store.
+
+Chunks are keyed by the SHA-256 of their whitespace-normalized text (see rag.text_key)
+and the embedding model name, so a document that many students upload is only
+embedded once. Vectors are stored as float32 blobs in a WAL-mode SQLite file that
+every worker on the host shares. The file lives in the user's home directory by
+default; in a container, point EMBEDDING_STORE_PATH at a mounted volume so the
+store survives restarts.
+"""
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+import numpy as np
+
+EMBEDDING_STORE_PATH = os.getenv(
+    "EMBEDDING_STORE_PATH", os.path.join(os.path.expanduser("~"), ".vivagraph", "embeddings.sqlite")
+)
+
+
+class ChunkEmbeddingStore:
+    def __init__(self, path: str, model: str):
+        self.path = path
+        self.model = model
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.stats = {"reused": 0, "computed": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_embeddings ("
+                "model TEXT NOT NULL, chunk_key TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, chunk_key))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: list) -> dict:
+        if not keys:
+            return {}
+        with self._lock:
+            conn = self._connect()
+            found = {}
+            # Stay below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT chunk_key, vector FROM chunk_embeddings WHERE model = ? AND chunk_key IN ({','.join('?' * len(part))})",
+                    [self.model, *part],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items: dict):
+        if not items:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunk_embeddings (model, chunk_key, vector) VALUES (?, ?, ?)",
+                [(self.model, key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()],
+            )
+            conn.commit()
+
+    def embed(self, embedder, texts: list, keys: list) -> list:
+        """Returns vectors for texts, embedding only the chunks that are not stored yet."""
+        stored = self.get_many(list(set(keys)))
+        missing = [i for i, key in enumerate(keys) if key not in stored]
+        if missing:
+            computed = embedder.embed_documents([texts[i] for i in missing])
+            new = {keys[i]: vector for i, vector in zip(missing, computed)}
+            self.put_many(new)
+            stored.update(new)
+        self.stats["reused"] += len(keys) - len(missing)
+        self.stats["computed"] += len(missing)
+        return [stored[key] for key in keys]
@@ -0,0 +1,80 @@
+"""
+Prompt context budget for the examiner and feedback agents.
+
+Only the last HISTORY_VERBATIM_TURNS question/answer turns go into prompts verbatim.
+Older turns are folded into `AgentState.history_summary` by the history_summary node,
+which runs in parallel with the answer analysis, so prompt size stays roughly flat
+however long the session gets. Evaluations are passed as a compact digest instead of
+their Python repr.
+"""
+import os
+from typing import Optional
+
+HISTORY_VERBATIM_TURNS = int(os.getenv("HISTORY_VERBATIM_TURNS", "3"))
+# Per-message cap on what is shown verbatim, presentation speeches can be very long
+HISTORY_MESSAGE_CHARS = int(os.getenv("HISTORY_MESSAGE_CHARS", "2000"))
+DIGEST_FEEDBACK_CHARS = 160
+
+ROLE_LABELS = {"ai": "Examiner", "human": "Student"}
+
+
+def verbatim_start(history: list) -> int:
+    """Index of the first message that is kept verbatim."""
+    return max(0, len(history) - HISTORY_VERBATIM_TURNS * 2)
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit].rstrip() + " ..."
+
+
+def format_messages(messages: list, limit: Optional[int] = HISTORY_MESSAGE_CHARS) -> str:
+    return "\n".join(
+        f"{ROLE_LABELS.get(m['role'], m['role'])}: {_clip(m['content'], limit) if limit else m['content']}"
+        for m in messages
+    )
+
+
+def render_history(state) -> str:
+    """
+    Summary of older turns followed by the recent turns verbatim.
+    Messages the summary does not cover yet (e.g. the summarizer failed) stay verbatim.
+    """
+    history = state.history
+    if not history:
+        return "None yet"
+    start = min(state.summarized_until, verbatim_start(history))
+    parts = []
+    if start > 0:
+        parts.append(f"Summary of earlier turns: {state.history_summary}")
+    parts.append(format_messages(history[start:]))
+    return "\n".join(parts)
+
+
+def evaluation_digest(evaluations: list) -> str:
+    """One line per scored answer instead of the full evaluation dicts."""
+    if not evaluations:
+        return "None"
+    lines = []
+    for i, e in enumerate(evaluations, 1):
+        scores = ", ".join(
+            f"{key} {e[key]}" for key in ("concept_correctness", "clarity", "completeness", "confidence", "handling")
+            if key in e
+        )
+        feedback = e.get("feedback_text") or e.get("feedback") or ""
+        lines.append(f"A{i}: {scores or 'unscored'}" + (f" - {_clip(feedback, DIGEST_FEEDBACK_CHARS)}" if feedback else ""))
+    return "\n".join(lines)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text
+    return len(text) // 4
+
+
+def log_tokens(agent: str, response, inputs: Optional[dict] = None):
+    """Logs the token counts reported by the provider, or an estimate from the prompt inputs."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        print(f"[TOKENS] {agent}: input={usage.get('input_tokens')} output={usage.get('output_tokens')}")
+    else:
+        prompt_tokens = sum(estimate_tokens(str(v)) for v in (inputs or {}).values())
+        print(f"[TOKENS] {agent}: input~{prompt_tokens} (estimated from prompt variables)")
@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import create_client, acreate_client, Client, AsyncClient
+from typing import Optional
 from pinecone import Pinecone, ServerlessSpec
 
 # Load environment variables
@@ -15,6 +16,18 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Async client used by the API handlers and graph nodes so DB writes don't block the event loop
+_async_supabase: Optional[AsyncClient] = None
+
+async def get_async_supabase() -> AsyncClient:
+    """
+    Returns the shared async Supabase client, creating it on first use.
+    """
+    global _async_supabase
+    if _async_supabase is None:
+        _async_supabase = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+    return _async_supabase
+
 # Pinecone Setup
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "ai-viva-and-coaching-agent")
@@ -24,10 +37,10 @@ if not PINECONE_API_KEY:
 
 pc = Pinecone(api_key=PINECONE_API_KEY)
 
-def get_pinecone_index():
+def get_pinecone_index(pool_threads: int = 1):
     # Check if index exists, if not create it (though instructions say it should exist)
     # This function returns the index object
-    return pc.Index(PINECONE_INDEX_NAME)
+    return pc.Index(PINECONE_INDEX_NAME, pool_threads=pool_threads)
 
 # Test connections (Optional, can be called from main)
 def check_connections():
@@ -0,0 +1,168 @@
+"""
+Streaming document text extraction.
+
+Uploads are spooled to a temp file instead of being held in memory. PDF pages are
+extracted in parallel by a process pool, in page order, and fed straight into the
+text splitter, so peak memory is bounded by the batch size rather than the document.
+Uploads larger than MAX_UPLOAD_BYTES are rejected and PDFs are cut at MAX_PDF_PAGES.
+"""
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Optional
+
+from .rag import make_text_splitter, text_key
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "200"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "2"))
+PAGES_PER_TASK = 8
+TEXT_BLOCK_CHARS = 64 * 1024
+UPLOAD_READ_BYTES = 1024 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def spool_upload(upload) -> str:
+    """
+    Copies a FastAPI UploadFile to a temp file in fixed-size reads.
+    Raises UploadTooLarge once more than MAX_UPLOAD_BYTES have been read.
+    """
+    suffix = os.path.splitext(upload.filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="vivagraph-upload-", suffix=suffix)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = await upload.read(UPLOAD_READ_BYTES)
+                if not block:
+                    break
+                size += len(block)
+                if size > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+                out.write(block)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def _count_pdf_pages(path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _extract_pdf_pages(path: str, start: int, end: int) -> list:
+    # Runs in a worker process, reads only the requested pages
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    texts = []
+    for i in range(start, end):
+        try:
+            texts.append(reader.pages[i].extract_text() or "")
+        except Exception as e:
+            print(f"Error reading PDF page {i}: {e}")
+            texts.append("")
+    return texts
+
+
+async def iter_pdf_pages(path: str) -> AsyncIterator[str]:
+    """Yields page texts in order while later pages are extracted in parallel."""
+    loop = asyncio.get_running_loop()
+    try:
+        page_count = await asyncio.to_thread(_count_pdf_pages, path)
+    except Exception as e:
+        print(f"Error reading PDF: {e}")
+        return
+    if page_count > MAX_PDF_PAGES:
+        print(f"[EXTRACT] PDF has {page_count} pages, only the first {MAX_PDF_PAGES} are indexed")
+        page_count = MAX_PDF_PAGES
+
+    pool = _get_pool()
+    ranges = [(i, min(i + PAGES_PER_TASK, page_count)) for i in range(0, page_count, PAGES_PER_TASK)]
+    # Keep a couple of tasks per worker in flight, so memory stays bounded
+    window = PDF_EXTRACT_WORKERS * 2
+    pending = [loop.run_in_executor(pool, _extract_pdf_pages, path, s, e) for s, e in ranges[:window]]
+    next_range = len(pending)
+    try:
+        while pending:
+            texts = await pending.pop(0)
+            if next_range < len(ranges):
+                s, e = ranges[next_range]
+                pending.append(loop.run_in_executor(pool, _extract_pdf_pages, path, s, e))
+                next_range += 1
+            for text in texts:
+                yield text
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def iter_text_blocks(path: str) -> AsyncIterator[str]:
+    """Yields a plain-text file in blocks, falling back to latin-1 if it is not UTF-8."""
+    for encoding in ("utf-8", "latin-1"):
+        try:
+            with open(path, encoding=encoding) as f:
+                # Validate the encoding before yielding anything
+                if encoding == "utf-8":
+                    while await asyncio.to_thread(f.read, TEXT_BLOCK_CHARS):
+                        pass
+                    f.seek(0)
+                while True:
+                    block = await asyncio.to_thread(f.read, TEXT_BLOCK_CHARS)
+                    if not block:
+                        return
+                    yield block
+        except UnicodeDecodeError:
+            continue
+
+
+async def iter_chunk_batches(path: str, filename: str, batch_size: int) -> AsyncIterator[list]:
+    """
+    Streams the document through the splitter and yields batches of unique chunks.
+    The last (possibly incomplete) chunk of each page is carried over into the next one.
+    """
+    splitter = make_text_splitter()
+    source = iter_pdf_pages(path) if filename.lower().endswith(".pdf") else iter_text_blocks(path)
+
+    seen = set()
+    batch = []
+    carry = ""
+    async for text in source:
+        chunks = splitter.split_text(carry + text + "\n")
+        if not chunks:
+            continue
+        carry = chunks.pop()
+        for chunk in chunks:
+            key = text_key(chunk)
+            if key not in seen:
+                seen.add(key)
+                batch.append(chunk)
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+
+    if carry.strip() and text_key(carry) not in seen:
+        batch.append(carry)
+    while batch:
+        yield batch[:batch_size]
+        batch = batch[batch_size:]
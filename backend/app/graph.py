@@ -1,23 +1,45 @@
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+import os
 from .models import AgentState
 from .agents.examiner import examiner_agent
 from .agents.strategy import strategy_agent
-from .agents.evaluation import evaluation_agent
+from .agents.evaluation import evaluation_agent, score_dispatch_agent
+from .agents.assess import assess_agent
 from .agents.speech import speech_analysis_agent
 from .agents.feedback import feedback_agent
 from .agents.memory import memory_agent
+from .agents.summary import history_summary_agent
+from .agents.retrieval import evaluation_retrieval_agent, examiner_retrieval_agent
+from .checkpoint import build_checkpointer
+from .timing import timed_node
+from .scoring import GRAPH_ASYNC_SCORING
+
+# Fan out speech analysis and both RAG lookups as soon as an answer arrives.
+# Set GRAPH_PARALLEL_FANOUT=0 for the old sequential pipeline (e.g. to compare timings)
+GRAPH_PARALLEL_FANOUT = os.getenv("GRAPH_PARALLEL_FANOUT", "1") == "1"
+# Score the answer and pick the next step in one LLM call (assess) instead of evaluation + strategy LLM
+GRAPH_MERGED_ASSESS = os.getenv("GRAPH_MERGED_ASSESS", "0") == "1"
 
 # Define the graph
 workflow = StateGraph(AgentState)
 
 # Nodes
-workflow.add_node("strategy", strategy_agent)
-workflow.add_node("examiner", examiner_agent)
-workflow.add_node("evaluation", evaluation_agent)
-workflow.add_node("speech_analysis", speech_analysis_agent)
-workflow.add_node("feedback", feedback_agent)
-workflow.add_node("memory", memory_agent)
+workflow.add_node("strategy", timed_node("strategy", strategy_agent))
+workflow.add_node("examiner", timed_node("examiner", examiner_agent))
+if GRAPH_ASYNC_SCORING:
+    # Scores are computed in the background, the merged assess call is not used
+    scoring_node = "score_dispatch"
+    workflow.add_node("score_dispatch", timed_node("score_dispatch", score_dispatch_agent))
+elif GRAPH_MERGED_ASSESS:
+    scoring_node = "assess"
+    workflow.add_node("assess", timed_node("assess", assess_agent))
+else:
+    scoring_node = "evaluation"
+    workflow.add_node("evaluation", timed_node("evaluation", evaluation_agent))
+workflow.add_node("speech_analysis", timed_node("speech_analysis", speech_analysis_agent))
+workflow.add_node("feedback", timed_node("feedback", feedback_agent))
+workflow.add_node("memory", timed_node("memory", memory_agent))
+workflow.add_node("history_summary", timed_node("history_summary", history_summary_agent))
 
 # Entry Point
 workflow.set_entry_point("strategy")
@@ -38,19 +60,38 @@ workflow.add_conditional_edges(
 )
 
 # Flow
-# Strategy -> Examiner -> Speech Analysis (Interrupt before this to get user input) -> Evaluation -> Strategy
+if GRAPH_PARALLEL_FANOUT:
+    # Strategy -> Examiner -> (Interrupt to get user input) ->
+    #   Speech Analysis | Evaluation Retrieval -> Evaluation (or Assess) | Examiner Retrieval | History Summary -> Strategy
+    if not GRAPH_ASYNC_SCORING:
+        workflow.add_node("evaluation_retrieval", timed_node("evaluation_retrieval", evaluation_retrieval_agent))
+    workflow.add_node("examiner_retrieval", timed_node("examiner_retrieval", examiner_retrieval_agent))
 
-workflow.add_edge("examiner", "speech_analysis")
-workflow.add_edge("speech_analysis", "evaluation")
-workflow.add_edge("evaluation", "strategy")
+    if GRAPH_ASYNC_SCORING:
+        # The background evaluation fetches its own context
+        answer_nodes = ["speech_analysis", scoring_node, "examiner_retrieval", "history_summary"]
+    else:
+        answer_nodes = ["speech_analysis", "evaluation_retrieval", "examiner_retrieval", "history_summary"]
+        workflow.add_edge("evaluation_retrieval", scoring_node)
+    for node in answer_nodes:
+        workflow.add_edge("examiner", node)
+    # Strategy waits for every branch
+    workflow.add_edge(["speech_analysis", scoring_node, "examiner_retrieval", "history_summary"], "strategy")
+else:
+    # Strategy -> Examiner -> Speech Analysis (Interrupt before this to get user input) -> History Summary -> Evaluation (or Assess) -> Strategy
+    answer_nodes = ["speech_analysis"]
+    workflow.add_edge("examiner", "speech_analysis")
+    workflow.add_edge("speech_analysis", "history_summary")
+    workflow.add_edge("history_summary", scoring_node)
+    workflow.add_edge(scoring_node, "strategy")
 
 # End Flow
 workflow.add_edge("feedback", "memory")
 workflow.add_edge("memory", END)
 
-# Checkpointer for state persistence
-checkpointer = MemorySaver()
+# Checkpointer for state persistence (durable backend chosen by CHECKPOINT_BACKEND)
+checkpointer = build_checkpointer()
 
 # Compile
-# Interrupt before speech_analysis so we can inject the human answer into the state
-app_graph = workflow.compile(checkpointer=checkpointer, interrupt_before=["speech_analysis"])
+# Interrupt before the answer nodes so we can inject the human answer into the state
+app_graph = workflow.compile(checkpointer=checkpointer, interrupt_before=answer_nodes)
@@ -0,0 +1,119 @@
+"""
+Background document ingestion.
+
+/api/start hands uploaded files to an asyncio job queue and returns right away.
+A small pool of workers streams each spooled upload through the page extractor,
+splitter and embedder in batches, so retrieval can already use the chunks indexed
+so far while the rest of a large syllabus is still being processed.
+Jobs live in this process, multi-worker deployments need sticky sessions
+(see DEPLOYMENT.md, "Running Several Workers").
+"""
+import asyncio
+import os
+import time
+from typing import Optional
+
+from .rag import index_chunks
+from .extract import iter_chunk_batches
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+# Finished jobs are kept this long so clients can still poll their status
+INGEST_JOB_TTL_SECONDS = int(os.getenv("INGEST_JOB_TTL_SECONDS", "3600"))
+
+
+class IngestionJob:
+    def __init__(self, session_id: str, filename: str, path: str):
+        self.session_id = session_id
+        self.filename = filename
+        self.path = path
+        self.status = "queued"  # queued, processing, completed, failed
+        self.total_chunks = 0
+        self.indexed_chunks = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "filename": self.filename,
+            "status": self.status,
+            "total_chunks": self.total_chunks,
+            "indexed_chunks": self.indexed_chunks,
+            "error": self.error,
+        }
+
+
+class IngestionQueue:
+    """Job queue drained by a fixed pool of worker tasks."""
+    def __init__(self, workers: int = INGEST_WORKERS, batch_size: int = INGEST_BATCH_SIZE):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.jobs = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, session_id: str, filename: str, path: str) -> IngestionJob:
+        """Queues a spooled upload, the job deletes the file once it is done."""
+        self.start()
+        self._prune()
+        job = IngestionJob(session_id, filename, path)
+        self.jobs[session_id] = job
+        self._queue.put_nowait(job)
+        print(f"[INGEST] Queued {filename} for session {session_id}")
+        return job
+
+    def get(self, session_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(session_id)
+
+    def _prune(self):
+        cutoff = time.time() - INGEST_JOB_TTL_SECONDS
+        for session_id, job in list(self.jobs.items()):
+            if job.finished_at and job.finished_at < cutoff:
+                del self.jobs[session_id]
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                print(f"[INGEST] Worker {worker_id} failed on {job.filename}: {e}")
+            finally:
+                if os.path.exists(job.path):
+                    os.remove(job.path)
+                job.finished_at = time.time()
+                job.done.set()
+                self._queue.task_done()
+
+    async def _process(self, job: IngestionJob):
+        job.status = "processing"
+        start = time.perf_counter()
+
+        metadata = {"session_id": job.session_id}
+        async for batch in iter_chunk_batches(job.path, job.filename, self.batch_size):
+            job.total_chunks += len(batch)
+            await index_chunks(batch, metadata)
+            job.indexed_chunks += len(batch)
+
+        job.status = "completed"
+        print(f"[INGEST] Indexed {job.indexed_chunks} chunks of {job.filename} in {time.perf_counter() - start:.1f}s")
+
+
+ingestion_queue = IngestionQueue()
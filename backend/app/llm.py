@@ -0,0 +1,344 @@
+"""
+Shared LLM gateway for the agents.
+
+`get_llm(model)` returns a chat model that drops into the existing `prompt | llm` chains
+(streaming included) but runs every call through one pool per provider and model.
+Sync calls (invoke/batch) take the same providers in the same order, without hedging:
+- a concurrency limit (LLM_MAX_CONCURRENCY) and a request timeout (LLM_TIMEOUT_SECONDS)
+- automatic failover from Cerebras to Groq (when GROQ_API_KEY is set) on errors/timeouts
+- optional hedging (LLM_HEDGE=1): if the primary has not answered within its observed
+  p95 latency, the same request is sent to the fallback and the first answer wins
+- per-model latency percentiles, error/timeout/hedge counts and token totals,
+  served on /api/metrics
+- an opt-in response memo (`get_llm(model, memoize=True)`) for deterministic calls,
+  keyed by model, rendered prompt and temperature, bounded by LLM_MEMO_SIZE entries
+  and LLM_MEMO_TTL_SECONDS
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, List, Optional
+
+from langchain_cerebras import ChatCerebras
+from langchain_groq import ChatGroq
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+# Latency samples needed before the p95 is trusted for hedging
+LLM_HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 500
+# Provider calls run without the caller's callbacks, the gateway model already reports
+# the run (and its tokens) once
+NO_CALLBACKS = {"callbacks": []}
+
+LLM_MEMO_SIZE = int(os.getenv("LLM_MEMO_SIZE", "256"))
+LLM_MEMO_TTL_SECONDS = int(os.getenv("LLM_MEMO_TTL_SECONDS", "3600"))
+
+# Same model family on each provider
+GROQ_MODELS = {
+    "llama-3.3-70b": "llama-3.3-70b-versatile",
+    "llama3.1-8b": "llama-3.1-8b-instant",
+}
+
+
+def _percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class ResponseMemo:
+    """LRU of model responses with a TTL, for calls whose output only depends on the prompt."""
+
+    def __init__(self, size: int, ttl_seconds: int):
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, message)
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(model: str, messages: List[BaseMessage], temperature) -> str:
+        rendered = json.dumps([[m.type, m.content] for m in messages], sort_keys=True)
+        return hashlib.sha256(f"{model}\n{temperature}\n{rendered}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[BaseMessage]:
+        entry = self._entries.get(key)
+        if entry and time.time() - entry[0] < self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+        if entry:
+            del self._entries[key]
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, message: BaseMessage):
+        self._entries[key] = (time.time(), message)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def get_metrics(self) -> dict:
+        return {**self.stats, "entries": len(self._entries)}
+
+
+response_memo = ResponseMemo(LLM_MEMO_SIZE, LLM_MEMO_TTL_SECONDS)
+
+
+class ProviderPool:
+    """One provider/model pair with its own concurrency limit and metrics."""
+
+    def __init__(self, provider: str, model: str, client: BaseChatModel):
+        self.name = f"{provider}:{model}"
+        self.client = client
+        self._slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self._sync_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {"calls": 0, "errors": 0, "timeouts": 0, "input_tokens": 0, "output_tokens": 0}
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return _percentile(self.latencies, 0.95)
+
+    def _record(self, started: float, message: Optional[BaseMessage] = None):
+        self.latencies.append(time.perf_counter() - started)
+        usage = getattr(message, "usage_metadata", None) or {}
+        self.stats["input_tokens"] += usage.get("input_tokens", 0)
+        self.stats["output_tokens"] += usage.get("output_tokens", 0)
+
+    def _fail(self, e: Exception):
+        if isinstance(e, asyncio.TimeoutError):
+            self.stats["timeouts"] += 1
+            print(f"[LLM] {self.name} timed out after {LLM_TIMEOUT_SECONDS:g}s")
+        else:
+            self.stats["errors"] += 1
+            print(f"[LLM] {self.name} failed: {e}")
+
+    async def invoke(self, messages: List[BaseMessage], **kwargs) -> BaseMessage:
+        async with self._slots:
+            self.stats["calls"] += 1
+            started = time.perf_counter()
+            try:
+                message = await asyncio.wait_for(self.client.ainvoke(messages, config=NO_CALLBACKS, **kwargs), LLM_TIMEOUT_SECONDS)
+            except (Exception, asyncio.TimeoutError) as e:
+                self._fail(e)
+                raise
+            self._record(started, message)
+            return message
+
+    def invoke_sync(self, messages: List[BaseMessage], **kwargs) -> BaseMessage:
+        # The timeout is enforced by the client itself (see _pools_for)
+        with self._sync_slots:
+            self.stats["calls"] += 1
+            started = time.perf_counter()
+            try:
+                message = self.client.invoke(messages, config=NO_CALLBACKS, **kwargs)
+            except Exception as e:
+                self._fail(e)
+                raise
+            self._record(started, message)
+            return message
+
+    async def stream(self, messages: List[BaseMessage], **kwargs) -> AsyncIterator:
+        async with self._slots:
+            self.stats["calls"] += 1
+            started = time.perf_counter()
+            last = None
+            try:
+                stream = self.client.astream(messages, config=NO_CALLBACKS, **kwargs).__aiter__()
+                while True:
+                    # The timeout applies to the wait for each chunk
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), LLM_TIMEOUT_SECONDS)
+                    except StopAsyncIteration:
+                        break
+                    last = chunk if last is None else last + chunk
+                    yield chunk
+            except (Exception, asyncio.TimeoutError) as e:
+                self._fail(e)
+                raise
+            self._record(started, last)
+
+    def get_metrics(self) -> dict:
+        return {
+            **self.stats,
+            "p50_ms": round(_percentile(self.latencies, 0.5) * 1000, 1),
+            "p95_ms": round(_percentile(self.latencies, 0.95) * 1000, 1),
+        }
+
+
+class GatewayChatModel(BaseChatModel):
+    """Chat model that routes calls through the provider pools, primary first."""
+
+    model: str
+    memoize: bool = False
+    hedges: int = 0
+    hedge_wins: int = 0
+    failovers: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "gateway"
+
+    @property
+    def pools(self) -> List[ProviderPool]:
+        return _pools_for(self.model)
+
+    def _memo_lookup(self, pools: List[ProviderPool], messages, kwargs):
+        """Returns (memo key, cached message), both None when memoization is off."""
+        if not self.memoize:
+            return None, None
+        temperature = kwargs.get("temperature", getattr(pools[0].client, "temperature", None))
+        memo_key = ResponseMemo.key(self.model, messages, temperature)
+        cached = response_memo.get(memo_key)
+        if cached is not None:
+            print(f"[LLM] {self.model} response served from memo")
+        return memo_key, cached
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if stop:
+            kwargs["stop"] = stop
+        pools = self.pools
+        memo_key, cached = self._memo_lookup(pools, messages, kwargs)
+        if cached is not None:
+            return ChatResult(generations=[ChatGeneration(message=cached)])
+        last_error = None
+        for i, pool in enumerate(pools):
+            try:
+                message = pool.invoke_sync(messages, **kwargs)
+                if memo_key:
+                    response_memo.put(memo_key, message)
+                return ChatResult(generations=[ChatGeneration(message=message)])
+            except Exception as e:
+                last_error = e
+                if i + 1 < len(pools):
+                    self.failovers += 1
+                    print(f"[LLM] Failing over {pool.name} -> {pools[i + 1].name}")
+        raise last_error
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if stop:
+            kwargs["stop"] = stop
+        pools = self.pools
+        memo_key, cached = self._memo_lookup(pools, messages, kwargs)
+        if cached is not None:
+            return ChatResult(generations=[ChatGeneration(message=cached)])
+        last_error = None
+        for i, pool in enumerate(pools):
+            fallback = pools[i + 1] if i + 1 < len(pools) else None
+            try:
+                if LLM_HEDGE and fallback:
+                    message = await self._hedged(pool, fallback, messages, kwargs)
+                else:
+                    message = await pool.invoke(messages, **kwargs)
+                if memo_key:
+                    response_memo.put(memo_key, message)
+                return ChatResult(generations=[ChatGeneration(message=message)])
+            except (Exception, asyncio.TimeoutError) as e:
+                last_error = e
+                if fallback:
+                    self.failovers += 1
+                    print(f"[LLM] Failing over {pool.name} -> {fallback.name}")
+        raise last_error
+
+    async def _hedged(self, primary: ProviderPool, fallback: ProviderPool, messages, kwargs) -> BaseMessage:
+        first = asyncio.create_task(primary.invoke(messages, **kwargs))
+        p95 = primary.p95()
+        if p95 is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=p95)
+        if done:
+            return first.result()
+
+        self.hedges += 1
+        print(f"[LLM] {primary.name} slower than p95 ({p95 * 1000:.0f}ms), hedging on {fallback.name}")
+        second = asyncio.create_task(fallback.invoke(messages, **kwargs))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Both failed, surface the primary's error so the caller fails over
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        if self.memoize:
+            # Memoized calls go through the memo, the whole answer arrives as one chunk
+            result = await self._agenerate(messages, stop=stop, **kwargs)
+            message = result.generations[0].message
+            yield ChatGenerationChunk(message=AIMessageChunk(content=message.content, usage_metadata=message.usage_metadata))
+            return
+        if stop:
+            kwargs["stop"] = stop
+        pools = self.pools
+        for i, pool in enumerate(pools):
+            started_output = False
+            try:
+                async for chunk in pool.stream(messages, **kwargs):
+                    started_output = True
+                    yield ChatGenerationChunk(message=chunk)
+                return
+            except (Exception, asyncio.TimeoutError):
+                # Tokens already went to the client, a restart on another provider would repeat them
+                if started_output or i + 1 == len(pools):
+                    raise
+                self.failovers += 1
+                print(f"[LLM] Failing over {pool.name} -> {pools[i + 1].name}")
+
+    def get_metrics(self) -> dict:
+        return {"hedges": self.hedges, "hedge_wins": self.hedge_wins, "failovers": self.failovers}
+
+
+_pools = {}
+_models = {}
+
+
+def _pools_for(model: str) -> List[ProviderPool]:
+    if model not in _pools:
+        # Client-side timeouts bound the sync path, async calls are also wrapped in wait_for
+        pools = [ProviderPool("cerebras", model, ChatCerebras(
+            api_key=os.getenv("CEREBRAS_API_KEY"), model=model, timeout=LLM_TIMEOUT_SECONDS))]
+        if os.getenv("GROQ_API_KEY") and model in GROQ_MODELS:
+            groq_model = GROQ_MODELS[model]
+            pools.append(ProviderPool("groq", groq_model, ChatGroq(
+                api_key=os.getenv("GROQ_API_KEY"), model=groq_model, timeout=LLM_TIMEOUT_SECONDS)))
+        _pools[model] = pools
+    return _pools[model]
+
+
+def get_llm(model: str, memoize: bool = False) -> GatewayChatModel:
+    """
+    Shared gateway model for `model`, agents asking for the same model share its pools.
+    memoize=True serves repeated identical prompts from the response memo, only use it
+    where a repeated call should return the same answer (e.g. final feedback on retry).
+    """
+    key = (model, memoize)
+    if key not in _models:
+        _models[key] = GatewayChatModel(model=model, memoize=memoize)
+    return _models[key]
+
+
+def get_metrics() -> dict:
+    metrics = {}
+    for (model, _), llm in _models.items():
+        entry = metrics.setdefault(model, {"hedges": 0, "hedge_wins": 0, "failovers": 0})
+        for name, value in llm.get_metrics().items():
+            entry[name] += value
+        entry["providers"] = {pool.name: pool.get_metrics() for pool in _pools.get(model, [])}
+    metrics["memo"] = response_memo.get_metrics()
+    return metrics
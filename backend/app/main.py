@@ -1,21 +1,64 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import Optional
 import uuid
+import time
+import json
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
 
 # Load environment variables before importing other modules
 load_dotenv()
 
-from .models import AgentState, SessionCreate
-from .graph import app_graph
-from .db import supabase
-from .stt import transcribe_audio
-from .rag import process_and_index_document
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from .models import AgentState, SessionCreate, SpeechData
+from .graph import app_graph, checkpointer
+from .db import get_async_supabase
+from .stt import transcribe_audio, read_audio, AudioTooLarge
+from .stt_stream import transcript_streams
+from .rag import vector_service, forget_session
+from .ingest import ingestion_queue
+from .extract import spool_upload, shutdown_pool, UploadTooLarge
+from .timing import get_timings, record_timing
+from . import policy
+from .scoring import scoring_queue
+from .speculation import speculator, SPECULATIVE_PREFETCH
+from .structured import structured_stats
+from . import llm
+from .agents.examiner import build_examiner_query, fetch_examiner_context
+from .agents.evaluation import build_evaluation_query, fetch_evaluation_context
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
+from fastapi.responses import StreamingResponse, Response
 
-app = FastAPI(title="AI Viva and Coaching Agent")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the checkpoint store up front and start evicting expired interviews
+    await checkpointer.setup()
+    # Abandoned interviews never reach /api/end, drop their per-session state when they expire
+    checkpointer.on_evict(forget_session)
+    checkpointer.on_evict(scoring_queue.forget)
+    checkpointer.on_evict(speculator.discard)
+    checkpointer.start_sweeper()
+    ingestion_queue.start()
+    # Load the embedding model and open the Pinecone connection before the first session
+    try:
+        await vector_service.warm_up()
+    except Exception as e:
+        print(f"[RAG] Warm-up failed: {e}")
+    if SPECULATIVE_PREFETCH:
+        from .tts import VOICE_MAP
+        phrase_warmup = asyncio.create_task(speculator.warm_phrases(sorted(set(VOICE_MAP.values()))))
+    yield
+    if SPECULATIVE_PREFETCH:
+        phrase_warmup.cancel()
+    await ingestion_queue.stop()
+    shutdown_pool()
+    await checkpointer.stop_sweeper()
+    await checkpointer.aclose()
+
+app = FastAPI(title="AI Viva and Coaching Agent", lifespan=lifespan)
 
 # CORS
 origins = ["*"]
@@ -27,10 +70,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for thread config (simplified)
-# In production, use a persistent checkpointer and manage thread_ids
-sessions = {}
-
 class StartRequest(BaseModel):
     topic: str
     strictness: str
@@ -40,6 +79,7 @@ class StartRequest(BaseModel):
 class AnswerRequest(BaseModel):
     session_id: str
     transcript: str
+    speech: Optional[SpeechData] = None # From /api/transcribe, omitted for typed answers
 
 class EndRequest(BaseModel):
     session_id: str
@@ -50,21 +90,24 @@ async def end_interview(request: EndRequest):
     thread = {"configurable": {"thread_id": session_id}}
     
     # Update state to force completion
-    app_graph.update_state(thread, {"interview_complete": True})
+    await app_graph.aupdate_state(thread, {"interview_complete": True})
     
     # Resume graph to generate feedback
-    events = app_graph.stream(None, thread, stream_mode="values")
-    
     last_state = None
     final_feedback = None
     
-    for event in events:
+    async for event in app_graph.astream(None, thread, stream_mode="values"):
         last_state = event
         if "feedback_summary" in event and event["feedback_summary"]:
             final_feedback = event["feedback_summary"]
             
     if not last_state:
          raise HTTPException(status_code=500, detail="Graph processing failed")
+
+    await checkpointer.mark_finished(session_id)
+    forget_session(session_id)
+    scoring_queue.forget(session_id)
+    speculator.discard(session_id)
          
     return {
         "status": "completed",
@@ -82,30 +125,37 @@ async def start_viva(
     session_id = str(uuid.uuid4())
     thread = {"configurable": {"thread_id": session_id}}
     
-    # If a file is provided, process and index it
+    # If a file is provided, index it in the background
+    # The first question uses whatever chunks are ready by the time the examiner retrieves
+    ingestion = None
     if file:
-        content = await file.read()
-        await process_and_index_document(content, file.filename, metadata={"session_id": session_id})
+        try:
+            path = await spool_upload(file)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        ingestion = ingestion_queue.submit(session_id, file.filename, path).to_dict()
     
     # User / Mastery Logic
     mastery_level = 0
     try:
+        supabase = await get_async_supabase()
+
         # 1. Get or Create User
-        user_resp = supabase.table("users").select("id").eq("email", user_email).execute()
+        user_resp = await supabase.table("users").select("id").eq("email", user_email).execute()
         if user_resp.data:
             user_id = user_resp.data[0]["id"]
         else:
             # Create user
-            user_insert = supabase.table("users").insert({"email": user_email, "full_name": user_email.split("@")[0]}).execute()
+            user_insert = await supabase.table("users").insert({"email": user_email, "full_name": user_email.split("@")[0]}).execute()
             user_id = user_insert.data[0]["id"]
             
         # 2. Get Mastery
-        mastery_resp = supabase.table("topic_mastery").select("mastery_level").eq("user_id", user_id).eq("topic", topic).execute()
+        mastery_resp = await supabase.table("topic_mastery").select("mastery_level").eq("user_id", user_id).eq("topic", topic).execute()
         if mastery_resp.data:
             mastery_level = mastery_resp.data[0]["mastery_level"]
             
         # 3. Create Session Record (Initial)
-        supabase.table("sessions").insert({
+        await supabase.table("sessions").insert({
             "id": session_id,
             "user_id": user_id,
             "topic": topic,
@@ -128,14 +178,10 @@ async def start_viva(
         presentation_stage="speaking" if mode == "presentation" else "qa" # Default to qa logic for viva (interactive)
     )
     
-    # store in global dict for referencing connection (not needed if using MemorySaver correctly per request)
-    
     # Run graph until interrupt (after examiner asks question)
     try:
-        events = app_graph.stream(initial_state, thread, stream_mode="values")
-        
         last_state = None
-        for event in events:
+        async for event in app_graph.astream(initial_state, thread, stream_mode="values"):
             last_state = event
             # print(event) 
         
@@ -159,22 +205,32 @@ async def start_viva(
     return {
         "session_id": session_id,
         "current_question": question,
-        "status": "in_progress"
+        "status": "in_progress",
+        "ingestion": ingestion
     }
 
-@app.post("/api/answer")
-async def submit_answer(request: AnswerRequest):
+@app.get("/api/ingest/{session_id}")
+async def ingestion_status(session_id: str):
+    job = ingestion_queue.get(session_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No ingestion job for this session")
+    return job.to_dict()
+
+async def inject_answer(request: AnswerRequest) -> dict:
+    """
+    Persists the answer and writes it into the paused graph state.
+    Returns the thread config to resume the graph with.
+    """
     session_id = request.session_id
     thread = {"configurable": {"thread_id": session_id}}
     
-    # 1. Get current state (should be paused before 'speech_analysis')
-    current_state = app_graph.get_state(thread)
-    if not current_state:
+    # 1. Get current state (should be paused before the answer nodes)
+    current_state = await app_graph.aget_state(thread)
+    if not current_state or not current_state.values:
          raise HTTPException(status_code=404, detail="Session not found")
          
     # 2. Append user answer to history
     # The state has the history up to the examiner's question.
-    history = current_state.values.get("history", [])
     current_question_id = current_state.values.get("current_question_id")
     
     # Persist Answer
@@ -187,46 +243,39 @@ async def submit_answer(request: AnswerRequest):
         }
         # If question_id is missing (e.g. restart/error), we might skip or insert validly if schema allows (it doesn't usually)
         if current_question_id:
-            res = supabase.table("answers").insert(ans_data).execute()
+            supabase = await get_async_supabase()
+            res = await supabase.table("answers").insert(ans_data).execute()
             if res.data:
                 answer_id = res.data[0]["id"]
     except Exception as e:
         print(f"Error saving answer: {e}")
 
-    history.append({"role": "human", "content": request.transcript})
-    
-    # 3. Update state with the new history AND answer_id
+    # 3. Update state with the answer AND answer_id
+    # history has an append reducer, so only the new message is sent
     # CRITICAL SAFEGUARD: Re-inject session_id to ensure RAG works even if state lost it
-    app_graph.update_state(thread, {
-        "history": history, 
+    await app_graph.aupdate_state(thread, {
+        "history": [{"role": "human", "content": request.transcript}],
         "current_answer_id": answer_id,
-        "session_id": session_id 
+        "session_id": session_id,
+        # Timestamps only describe the transcript they came with
+        "answer_speech": request.speech.model_dump() if request.speech and request.speech.text.strip() == request.transcript.strip() else None
     })
-    
-    # 4. Resume graph execution
-    # streaming None triggers the next node (speech_analysis) with the updated state
-    events = app_graph.stream(None, thread, stream_mode="values")
-    
-    last_state = None
-    final_feedback = None
-    
-    for event in events:
-        last_state = event
-        if "feedback_summary" in event and event["feedback_summary"]:
-            final_feedback = event["feedback_summary"]
-            
-    if not last_state:
-         raise HTTPException(status_code=500, detail="Graph processing failed")
-            
+    return thread
+
+async def answer_result(session_id: str, last_state: dict) -> dict:
     # Check if interview complete
     if last_state.get("interview_complete"):
+        await checkpointer.mark_finished(session_id)
+        forget_session(session_id)
+        scoring_queue.forget(session_id)
+        speculator.discard(session_id)
         return {
             "status": "completed",
-            "feedback": final_feedback
+            "feedback": last_state.get("feedback_summary")
         }
         
     # Else return next question
-    # The graph loops back to Examiner -> Speech Analysis (paused)
+    # The graph loops back to Examiner -> answer nodes (paused)
     # So the last state should have the NEW question from Examiner
     history = last_state.get("history", [])
     
@@ -240,24 +289,83 @@ async def submit_answer(request: AnswerRequest):
         "current_question": question
     }
 
+@app.post("/api/answer")
+async def submit_answer(request: AnswerRequest):
+    start = time.perf_counter()
+    thread = await inject_answer(request)
+    
+    # 4. Resume graph execution
+    # streaming None triggers the answer nodes (speech analysis + retrieval) with the updated state
+    last_state = None
+    async for event in app_graph.astream(None, thread, stream_mode="values"):
+        last_state = event
+            
+    if not last_state:
+         raise HTTPException(status_code=500, detail="Graph processing failed")
+
+    record_timing("api_answer", (time.perf_counter() - start) * 1000)
+    return await answer_result(request.session_id, last_state)
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/answer/stream")
+async def submit_answer_stream(request: AnswerRequest):
+    """
+    Same as /api/answer, but streams Server-Sent Events while the graph runs:
+    - node:  {"node": name} when a graph node finishes
+    - token: {"text": chunk} for each token of the examiner's next question
+    - done:  the /api/answer response body
+    - error: {"detail": message}
+    """
+    start = time.perf_counter()
+    thread = await inject_answer(request)
+
+    async def events():
+        first_token = True
+        try:
+            async for mode, payload in app_graph.astream(None, thread, stream_mode=["updates", "messages"]):
+                if mode == "updates":
+                    for node in payload:
+                        if not node.startswith("__"):
+                            yield sse_event("node", {"node": node})
+                else:
+                    chunk, metadata = payload
+                    if metadata.get("langgraph_node") == "examiner" and chunk.content:
+                        if first_token:
+                            record_timing("answer_first_token", (time.perf_counter() - start) * 1000)
+                            first_token = False
+                        yield sse_event("token", {"text": chunk.content})
+
+            last_state = (await app_graph.aget_state(thread)).values
+            record_timing("api_answer", (time.perf_counter() - start) * 1000)
+            yield sse_event("done", await answer_result(request.session_id, last_state))
+        except Exception as e:
+            print(f"Streaming answer failed: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/api/progress")
 async def get_progress(email: str):
     try:
         if not email:
             raise HTTPException(status_code=400, detail="Email required")
             
+        supabase = await get_async_supabase()
+
         # 1. Get User ID
-        user_resp = supabase.table("users").select("id").eq("email", email).execute()
+        user_resp = await supabase.table("users").select("id").eq("email", email).execute()
         if not user_resp.data:
             return {"history": [], "mastery": []} 
             
         user_id = user_resp.data[0]["id"]
         
         # 2. Get Sessions
-        sessions_resp = supabase.table("sessions").select("*").eq("user_id", user_id).order("start_time", desc=True).execute()
+        sessions_resp = await supabase.table("sessions").select("*").eq("user_id", user_id).order("start_time", desc=True).execute()
         
         # 3. Get Topic Mastery
-        mastery_resp = supabase.table("topic_mastery").select("*").eq("user_id", user_id).execute()
+        mastery_resp = await supabase.table("topic_mastery").select("*").eq("user_id", user_id).execute()
         
         return {
             "history": sessions_resp.data,
@@ -275,10 +383,14 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "metrics": "/api/metrics",
             "start_session": "/api/start",
             "submit_answer": "/api/answer",
+            "submit_answer_stream": "/api/answer/stream",
+            "ingestion_status": "/api/ingest/{session_id}",
             "end_interview": "/api/end",
             "transcribe": "/api/transcribe",
+            "transcribe_stream": "/api/transcribe/stream",
             "speak": "/api/speak"
         }
     }
@@ -287,40 +399,182 @@ def root():
 def health():
     return {"status": "ok"}
 
+@app.get("/api/metrics")
+def metrics():
+    return {
+        "rag": vector_service.get_metrics(),
+        "checkpoint": checkpointer.stats,
+        "nodes": get_timings(),
+        "strategy": policy.get_metrics(),
+        "scoring": scoring_queue.get_metrics(),
+        "speculation": speculator.get_metrics(),
+        "structured_output": structured_stats,
+        "llm": llm.get_metrics(),
+        "tts": audio_cache.get_metrics()
+    }
+
+async def speculate_answer(session_id: str, transcript: str):
+    """
+    Starts the RAG lookups for an answer that is transcribed but not submitted yet.
+    """
+    if not SPECULATIVE_PREFETCH or not session_id or not transcript.strip():
+        return
+    try:
+        current_state = await app_graph.aget_state({"configurable": {"thread_id": session_id}})
+    except Exception as e:
+        print(f"[SPECULATION] Could not load session {session_id}: {e}")
+        return
+    if not current_state or not current_state.values:
+        return
+    state = AgentState(**current_state.values)
+    if state.interview_complete or not state.history or state.history[-1]["role"] != "ai":
+        return
+    # Build the queries exactly as the retrieval nodes will once the answer is in history
+    answered = state.model_copy(update={"history": state.history + [{"role": "human", "content": transcript}]})
+    evaluation_query = build_evaluation_query(answered)
+    examiner_query = build_examiner_query(answered)
+    speculator.start(session_id, "evaluation", evaluation_query, fetch_evaluation_context(evaluation_query, session_id))
+    speculator.start(session_id, "examiner", examiner_query, fetch_examiner_context(examiner_query, session_id))
+
 @app.post("/api/transcribe")
-async def transcribe(file: UploadFile = File(...)):
+async def transcribe(file: UploadFile = File(...), session_id: str = Form(None)):
     """
     Endpoint to transcribe audio file.
+    With session_id, the answer's RAG lookups start before it is submitted.
     """
     if not file:
         raise HTTPException(status_code=400, detail="No file uploaded")
     
-    # Pass the content type dynamically (e.g. audio/webm, audio/mp4)
-    # But stt.py hardcodes it currently. Let's fix stt.py call logic here OR relies on stt.py handling.
-    # Actually, stt.py reads (filename, file, "audio/m4a"). 
-    # Let's trust Groq handles webm if we pass it as binary.
-    
-    result = transcribe_audio(file)
+    try:
+        result = await transcribe_audio(file)
+    except AudioTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     if not result or 'text' not in result:
         raise HTTPException(status_code=500, detail="Transcription failed")
+    # Prefetch in the background, loading the session state must not delay the transcript
+    speculator.schedule(speculate_answer(session_id, result['text']))
         
-    return {"transcript": result['text']}
+    return {"transcript": result['text'], "speech": SpeechData.from_whisper(result)}
+
+@app.post("/api/transcribe/stream")
+async def start_transcript_stream(session_id: str = Form(None)):
+    """
+    Opens an incremental transcript for a long answer, audio segments are pushed to
+    /api/transcribe/stream/{stream_id} while the student is still speaking.
+    """
+    return transcript_streams.create(session_id).to_dict()
+
+@app.post("/api/transcribe/stream/{stream_id}")
+async def push_transcript_segment(
+    stream_id: str,
+    file: UploadFile = File(...),
+    offset: float = Form(...),
+    index: int = Form(None)
+):
+    """
+    Queues one self-contained audio segment starting `offset` seconds into the recording.
+    Returns immediately with the transcript stitched so far.
+    """
+    stream = transcript_streams.get(stream_id)
+    if not stream:
+        raise HTTPException(status_code=404, detail="Transcript stream not found")
+    try:
+        audio = await read_audio(file)
+    except AudioTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    stream.add(audio, offset, index, file.filename)
+    return stream.to_dict()
+
+@app.get("/api/transcribe/stream/{stream_id}")
+async def get_transcript_stream(stream_id: str):
+    stream = transcript_streams.get(stream_id)
+    if not stream:
+        raise HTTPException(status_code=404, detail="Transcript stream not found")
+    return stream.to_dict()
+
+@app.post("/api/transcribe/stream/{stream_id}/finish")
+async def finish_transcript_stream(stream_id: str):
+    """
+    Waits for the outstanding segments and returns the full transcript with segment timestamps.
+    """
+    stream = transcript_streams.pop(stream_id)
+    if not stream:
+        raise HTTPException(status_code=404, detail="Transcript stream not found")
+    result = await stream.finish()
+    speculator.schedule(speculate_answer(stream.session_id, result["text"]))
+    return {"transcript": result["text"], "speech": SpeechData.from_whisper(result), **result}
 
-from fastapi.responses import FileResponse
-from .tts import generate_speech_file
+from .tts import stream_speech, lookup_speech, synthesize_speech, speech_etag
+from .audio_cache import audio_cache
 
 class SpeakRequest(BaseModel):
     text: str
     strictness: str
 
+def parse_range(range_header: str, size: int):
+    """Parses a single 'bytes=start-end' range, returns None if it is unsatisfiable."""
+    try:
+        unit, spec = range_header.split("=", 1)
+        start_s, end_s = spec.split(",")[0].strip().split("-", 1)
+        if unit.strip() != "bytes":
+            return None
+        if start_s:
+            start, end = int(start_s), int(end_s) if end_s else size - 1
+        else:
+            # A suffix longer than the body selects all of it (RFC 7233 2.1)
+            start, end = max(0, size - int(end_s)), size - 1
+    except ValueError:
+        return None
+    if start < 0 or start > end or start >= size:
+        return None
+    return start, min(end, size - 1)
+
 @app.post("/api/speak")
-async def speak(request: SpeakRequest):
+async def speak(request: SpeakRequest, http_request: Request):
+    if not request.text:
+        raise HTTPException(status_code=400, detail="No text provided")
+
+    # Audio is content-addressed by voice + text, so the key doubles as a strong ETag
+    etag = f'"{speech_etag(request.text, request.strictness)}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "public, max-age=86400"}
+    if http_request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    clips = await lookup_speech(request.text, request.strictness)
+    range_header = http_request.headers.get("range")
+    if all(clip is not None for clip in clips) or range_header:
+        # Fully cached (or a range was asked for): serve the complete clip
+        try:
+            data = b"".join(clips) if all(c is not None for c in clips) else await synthesize_speech(request.text, request.strictness, clips)
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        if range_header and http_request.headers.get("if-range", etag) == etag:
+            byte_range = parse_range(range_header, len(data))
+            if byte_range is None:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(data)}"})
+            start, end = byte_range
+            return Response(
+                data[start:end + 1],
+                status_code=206,
+                media_type="audio/mpeg",
+                headers={**headers, "Content-Range": f"bytes {start}-{end}/{len(data)}"},
+            )
+        return Response(data, media_type="audio/mpeg", headers=headers)
+
+    audio = stream_speech(request.text, request.strictness, clips)
     try:
-        if not request.text:
-            raise HTTPException(status_code=400, detail="No text provided")
-            
-        file_path = await generate_speech_file(request.text, request.strictness)
-        return FileResponse(file_path, media_type="audio/mpeg", filename="speech.mp3")
+        # Pull the first frames before answering so synthesis errors still surface as a 500
+        first = await audio.__anext__()
+    except StopAsyncIteration:
+        first = b""
     except Exception as e:
         print(f"TTS Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        yield first
+        async for data in audio:
+            yield data
+
+    return StreamingResponse(body(), media_type="audio/mpeg", headers=headers)
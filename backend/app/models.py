@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Annotated, List, Literal, Optional
+import operator
 from datetime import datetime
 import uuid
 
@@ -64,6 +65,39 @@ class Answer(AnswerCreate):
     class Config:
         from_attributes = True
 
+# Speech data from STT, carried with the answer into AgentState for confidence analysis
+class SpeechSegment(BaseModel):
+    start: float
+    end: float
+    text: str = ""
+
+class SpeechWord(BaseModel):
+    word: str
+    start: float
+    end: float
+
+class SpeechData(BaseModel):
+    text: str = ""
+    duration: Optional[float] = None
+    segments: List[SpeechSegment] = []
+    words: List[SpeechWord] = []
+
+    @classmethod
+    def from_whisper(cls, result: dict) -> "SpeechData":
+        """Keeps only the fields we analyse from a Whisper verbose_json response."""
+        return cls(
+            text=result.get("text", ""),
+            duration=result.get("duration"),
+            segments=[
+                SpeechSegment(start=s["start"], end=s["end"], text=s.get("text", "").strip())
+                for s in result.get("segments") or []
+            ],
+            words=[
+                SpeechWord(word=w["word"], start=w["start"], end=w["end"])
+                for w in result.get("words") or []
+            ],
+        )
+
 # Evaluation Models
 class EvaluationCreate(BaseModel):
     answer_id: uuid.UUID
@@ -83,13 +117,67 @@ class Evaluation(EvaluationCreate):
         from_attributes = True
 
 # Agent Inputs/Outputs (LangGraph)
+class ScoredModel(BaseModel):
+    """Base for LLM outputs with bounded integer scores."""
+    @model_validator(mode="before")
+    @classmethod
+    def clamp_scores(cls, data):
+        # Out-of-range or numeric-string scores are fixed here instead of costing a repair call
+        if isinstance(data, dict):
+            data = dict(data)
+            for name, field in cls.model_fields.items():
+                value = data.get(name)
+                if field.annotation is int and isinstance(value, (int, float, str)):
+                    try:
+                        value = round(float(value))
+                    except ValueError:
+                        continue
+                    bounds = {type(m).__name__: m for m in field.metadata}
+                    if "Ge" in bounds:
+                        value = max(value, bounds["Ge"].ge)
+                    if "Le" in bounds:
+                        value = min(value, bounds["Le"].le)
+                    data[name] = value
+        return data
+
+class AnswerEvaluation(ScoredModel):
+    """Rubric scores for one answer as the evaluation prompt returns them (see EvaluationCreate)."""
+    concept_correctness: int = Field(ge=0, le=4)
+    clarity: int = Field(ge=0, le=2)
+    completeness: int = Field(ge=0, le=2)
+    confidence: int = Field(ge=0, le=1)
+    handling: int = Field(ge=0, le=1)
+    feedback_text: str = ""
+    improved_answer: str = ""
+
+class NextAction(BaseModel):
+    """Next step picked by the merged assess call, validated apart from its scores."""
+    next_action: Literal["ask_new_question", "ask_followup", "end_interview"]
+
+class FeedbackResource(BaseModel):
+    title: str
+    type: str = "Article"
+    link: str = ""
+
+class FeedbackReport(ScoredModel):
+    """Final session feedback, FEEDBACK_PROMPT's schema."""
+    overall_score: int = Field(ge=0, le=10)
+    summary: str
+    strengths: List[str] = []
+    weaknesses: List[str] = []
+    improvement_tips: List[str] = []
+    resources: List[FeedbackResource] = []
+
 class AgentState(BaseModel):
     session_id: Optional[str] = None
     topic: Optional[str] = "General"
     strictness_level: Optional[str] = "Moderate"
     current_question_index: int = 0
-    history: List[dict] = [] # List of {"role": "human"|"ai", "content": "..."}
-    evaluations: List[dict] = []
+    # Node updates are appended (operator.add), so nodes return only the new items
+    history: Annotated[List[dict], operator.add] = [] # List of {"role": "human"|"ai", "content": "..."}
+    evaluations: Annotated[List[dict], operator.add] = []
+    history_summary: Optional[str] = None # Rolling summary of turns older than the verbatim window
+    summarized_until: int = 0 # Number of history messages folded into history_summary
     
     # Flags
     interview_complete: bool = False
@@ -97,6 +185,7 @@ class AgentState(BaseModel):
     # Context
     topic_mastery: int = 0 # 0-100
     confidence_metrics: Optional[dict] = None # Latest confidence metrics
+    answer_speech: Optional[dict] = None # SpeechData of the latest answer as a plain dict (checkpoint-safe), kept out of history and prompts
     interview_stage: str = "intro" # intro, foundation, depth
 
     # DB Tracking
@@ -107,3 +196,10 @@ class AgentState(BaseModel):
     mode: str = "viva" # viva, presentation
     presentation_stage: str = "speaking" # speaking, qa (only used in presentation mode)
     feedback_summary: Optional[str] = None
+
+    # Next step suggested by the merged assess node, consumed by strategy
+    next_action: Optional[str] = None
+
+    # RAG context prefetched in parallel with speech analysis, cleared once consumed
+    evaluation_context: Optional[str] = None
+    examiner_context: Optional[str] = None
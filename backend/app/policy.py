@@ -0,0 +1,78 @@
+"""
+Rule-based interview policy for strategy_agent.
+
+Decides between ask_new_question / ask_followup / end_interview from the recent
+evaluation scores, the latest confidence metrics, the turn count and strictness.
+Only cases the rules cannot settle (enough questions asked but mixed evidence) are
+left to the LLM. STRATEGY_MODE=rules never calls the LLM, STRATEGY_MODE=llm always does.
+"""
+import os
+from typing import Optional
+
+STRATEGY_MODE = os.getenv("STRATEGY_MODE", "hybrid")  # hybrid, rules, llm
+# Questions asked before the rules may end the interview. A viva is capped at 5 questions
+# (see strategy_agent), so its minimum leaves room to end early or schedule follow-ups.
+STRATEGY_MIN_QUESTIONS = {
+    "viva": int(os.getenv("STRATEGY_MIN_QUESTIONS_VIVA", "3")),
+    "presentation": int(os.getenv("STRATEGY_MIN_QUESTIONS_PRESENTATION", "5")),
+}
+# Answers scoring below this (out of 10) get a follow-up
+WEAK_ANSWER_SCORE = 5
+# How far apart the last scores may be to count as a settled picture of the student
+SCORE_SPREAD = {"easy": 3, "moderate": 2, "strict": 1}
+SCORE_WINDOW = 3
+
+SCORE_KEYS = ("concept_correctness", "clarity", "completeness", "confidence", "handling")
+
+strategy_stats = {"rules": 0, "assess": 0, "llm": 0}
+
+
+def answer_score(evaluation: dict) -> Optional[float]:
+    """Total rubric score (0-10) of one evaluation, None if it could not be parsed."""
+    values = [evaluation[key] for key in SCORE_KEYS if isinstance(evaluation.get(key), (int, float))]
+    if not values:
+        return None
+    return min(10.0, max(0.0, float(sum(values))))
+
+
+def min_questions(mode: str) -> int:
+    return STRATEGY_MIN_QUESTIONS.get(mode, STRATEGY_MIN_QUESTIONS["viva"])
+
+
+def decide(num_questions: int, evaluations: list, confidence_metrics: Optional[dict], strictness: str,
+           mode: str = "viva") -> Optional[tuple]:
+    """
+    Returns (action, reason), or None when the case is ambiguous and should go to the LLM.
+    """
+    minimum = min_questions(mode)
+    scores = [s for s in (answer_score(e) for e in evaluations[-SCORE_WINDOW:]) if s is not None]
+    last = scores[-1] if scores else None
+    confidence = (confidence_metrics or {}).get("confidence")
+    weak = last is not None and (last < WEAK_ANSWER_SCORE or (confidence == "Low" and last < 7))
+
+    if num_questions < minimum:
+        if weak:
+            return "ask_followup", f"last answer scored {last:g}/10 (confidence {confidence})"
+        return "ask_new_question", f"only {num_questions} of {minimum} questions asked"
+
+    if len(scores) >= SCORE_WINDOW:
+        spread = max(scores) - min(scores)
+        if spread <= SCORE_SPREAD.get((strictness or "").lower(), 2):
+            return "end_interview", f"last {len(scores)} scores settled ({min(scores):g}-{max(scores):g})"
+    if weak:
+        return "ask_followup", f"last answer scored {last:g}/10 (confidence {confidence})"
+    return None
+
+
+def record_decision(action: str, source: str, reason: str):
+    strategy_stats[source] += 1
+    print(f"[STRATEGY] {action} ({source}): {reason}")
+
+
+def get_metrics() -> dict:
+    decided = sum(strategy_stats.values())
+    return {
+        "mode": STRATEGY_MODE,
+        **strategy_stats,
+        "rules_rate": round(strategy_stats["rules"] / decided, 3) if decided else 0.0,
+    }
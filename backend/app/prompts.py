@@ -28,13 +28,11 @@ EXAMINER_PERSONA_STRICT = """You are a tough, skeptical senior professor who dou
 - GOAL: expose gaps in knowledge and test resilience."""
 
 # Agent Prompts
+# Static instructions (and the persona) come first and the per-call values last, so
+# consecutive calls share a long identical prefix that provider prompt caching can reuse.
 EXAMINER_PROMPT = """You are an AI Viva Examiner.
-Context: {context}
-Topic: {topic}
-Strictness: {strictness}
-Student Mastery Level (0-100): {mastery}
-Interview Stage: {stage}
-Current Question History: {history}
+
+{persona_instructions}
 
 STAGE INSTRUCTIONS:
 - intro: Ask ONLY foundational "What is X?" definitions. IGNORE advanced context. Keep it extremely simple.
@@ -45,21 +43,23 @@ Your task is to ask the next question or a follow-up question based on the stude
 Unless this is the first question, analyze the previous answer regarding the context.
 
 CRITICAL CONTEXT RULES:
-1. If the "Context" section above contains specific document content (i.e., it is not "General Knowledge"):
+1. If the "Context" section below contains specific document content (i.e., it is not "General Knowledge"):
    - You must ask questions STRICTLY based on that provided text.
    - Do NOT ask about concepts not mentioned in the context.
    - Do NOT use outside knowledge to formulate questions, only use the source material.
 2. If "Context" is "General Knowledge", you may use your broad training on the Topic.
 
-{persona_instructions}
-
 Return only the question text. Do not include "Examiner:" prefix.
+
+Topic: {topic}
+Strictness: {strictness}
+Student Mastery Level (0-100): {mastery}
+Interview Stage: {stage}
+Context: {context}
+Current Question History: {history}
 """
 
 EVALUATION_PROMPT = """Evaluate the student's answer based on the provided context.
-Context: {context}
-Question: {question}
-Student Answer: {answer}
 
 Score the answer on the following criteria:
 1. Concept Correctness (0-4)
@@ -79,19 +79,82 @@ Format the output as JSON:
   "feedback_text": "<string>",
   "improved_answer": "<string>"
 }}
+
+Context: {context}
+Question: {question}
+Student Answer: {answer}
 """
 
 STRATEGY_PROMPT = """Decide the next step in the viva interview.
+
+Possible actions:
+- "ask_new_question": If the student lacks depth or you need to explore a new sub-topic.
+- "ask_followup": If the answer was weak, vague, or needs probing.
+- "end_interview": ONLY if you have gathered sufficient information to comprehensively evaluate the student (typically 5+ questions) OR if the conversation has naturally concluded.
+
+Return one of the actions above as a string.
+
 History (Last interaction): {history}
 Questions Asked So Far: {num_questions}
 Scores so far: {scores}
 Topic: {topic}
 Strictness: {strictness}
+"""
 
-Possible actions:
+SUMMARY_PROMPT = """Update the running summary of a viva interview.
+Write the updated summary in at most 150 words. Keep which concepts were asked about, how well the student answered each (correct, partial, wrong, unsure) and any misconceptions or open follow-ups. Return only the summary text.
+
+Topic: {topic}
+Current summary: {summary}
+
+New turns to fold in:
+{turns}
+"""
+
+ASSESS_PROMPT = """Evaluate the student's answer based on the provided context, then decide the next step in the viva interview.
+
+Score the answer on the following criteria:
+1. Concept Correctness (0-4)
+2. Clarity and Structure (0-2)
+3. Completeness (0-2)
+4. Confidence Indicators (0-1) (Based on text: hesitations, clarity)
+5. Handling Follow-ups (0-1)
+
+Then choose the next action:
 - "ask_new_question": If the student lacks depth or you need to explore a new sub-topic.
 - "ask_followup": If the answer was weak, vague, or needs probing.
-- "end_interview": ONLY if you have gathered sufficient information to comprehensively evaluate the student (typically 5+ questions) OR if the conversation has naturally concluded.
+- "end_interview": ONLY if you have gathered sufficient information to comprehensively evaluate the student (typically 5+ questions).
 
-Return one of the actions above as a string.
+Format the output as JSON only, without markdown:
+{{
+  "concept_correctness": <int>,
+  "clarity": <int>,
+  "completeness": <int>,
+  "confidence": <int>,
+  "handling": <int>,
+  "feedback_text": "<string>",
+  "improved_answer": "<string>",
+  "next_action": "ask_new_question" | "ask_followup" | "end_interview"
+}}
+
+Topic: {topic}
+Strictness: {strictness}
+Questions Asked So Far: {num_questions}
+Earlier Scores: {scores}
+Context: {context}
+Question: {question}
+Student Answer: {answer}
+"""
+
+REPAIR_PROMPT = """Fix a model output that was supposed to be a JSON object matching the JSON schema below.
+Return only the corrected JSON object, keeping the original content wherever possible. No markdown, no explanations.
+
+Schema:
+{schema}
+
+Validation errors:
+{errors}
+
+Output:
+{output}
 """
@@ -1,33 +1,461 @@
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from .db import PINECONE_INDEX_NAME, PINECONE_API_KEY
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+from .db import PINECONE_INDEX_NAME, get_pinecone_index
+from .chunk_store import ChunkEmbeddingStore, EMBEDDING_STORE_PATH
+from collections import OrderedDict
+import numpy as np
+import hashlib
+import json
+import threading
 import os
+import time
+import asyncio
+
+# Threads the shared Pinecone index uses for parallel upserts / queries
+PINECONE_POOL_THREADS = int(os.getenv("PINECONE_POOL_THREADS", "4"))
+
+# "pinecone" (default) or "local" (in-process NumPy index per session)
+RAG_BACKEND = os.getenv("RAG_BACKEND", "pinecone").lower()
+# When set, the local index memory-maps each session's vectors from this directory
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR")
+
+# Metadata field holding the chunk text in Pinecone
+TEXT_KEY = "text"
+
+# Chunks embedded per batch while indexing, upserts of batch N overlap embedding of N+1
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "16"))
+# >1 starts a persistent sentence-transformers multi-process encode pool for indexing
+EMBED_PROCESSES = int(os.getenv("EMBED_PROCESSES", "1"))
+
+# Cache sizes (entries)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "32"))      # per session
+RETRIEVAL_CACHE_SESSIONS = int(os.getenv("RETRIEVAL_CACHE_SESSIONS", "256"))
+
+def text_key(text: str) -> str:
+    """Stable hash of whitespace-normalized text."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss counters."""
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that memoizes vectors by normalized text hash, so overlapping
+    examiner / evaluation queries are not re-embedded on every turn.
+    """
+    def __init__(self, inner: Embeddings, max_size: int = EMBEDDING_CACHE_SIZE):
+        self.inner = inner
+        self.cache = LRUCache(max_size)
+
+    def embed_documents(self, texts: list) -> list:
+        keys = [text_key(t) for t in texts]
+        vectors = [self.cache.get(key) for key in keys]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            computed = self.inner.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+                self.cache.put(keys[i], vector)
+        return vectors
+
+    def embed_query(self, text: str) -> list:
+        key = text_key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.inner.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> list:
+        key = text_key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = await self.inner.aembed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+class MultiProcessEmbeddings(Embeddings):
+    """
+    Encodes document batches on a persistent sentence-transformers process pool.
+    HuggingFaceEmbeddings(multi_process=True) starts and stops a pool on every call,
+    this one is started once and reused. Queries stay in-process on `inner`.
+    """
+    def __init__(self, inner: HuggingFaceEmbeddings, processes: int):
+        self.inner = inner
+        self.processes = processes
+        self._model = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.inner.model_name, **self.inner.model_kwargs)
+                self._pool = self._model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+            return self._pool
+
+    def embed_documents(self, texts: list) -> list:
+        texts = [t.replace("\n", " ") for t in texts]
+        pool = self._get_pool()
+        vectors = self._model.encode_multi_process(texts, pool, **self.inner.encode_kwargs)
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> list:
+        return self.inner.embed_query(text)
+
+    async def aembed_query(self, text: str) -> list:
+        return await self.inner.aembed_query(text)
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._model.stop_multi_process_pool(self._pool)
+                self._pool = None
 
 # Initialize Embeddings
 # Using sentence-transformers/all-MiniLM-L6-v2 as a robust local default.
 # If "llama-text-embed-v2" is required via a specific provider, that configuration should be added here.
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+_base_embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+if EMBED_PROCESSES > 1:
+    _base_embeddings = MultiProcessEmbeddings(_base_embeddings, EMBED_PROCESSES)
+embeddings = CachedEmbeddings(_base_embeddings)
 
-def get_vectorstore():
-    return PineconeVectorStore(
-        index_name=PINECONE_INDEX_NAME,
-        embedding=embeddings,
-        pinecone_api_key=PINECONE_API_KEY
-    )
+# Per-session retrieval results: session_id -> LRUCache[(query hash, k) -> docs]
+# Invalidated whenever new documents are indexed for that session
+retrieval_cache = LRUCache(RETRIEVAL_CACHE_SESSIONS)
+retrieval_stats = {"hits": 0, "misses": 0}
 
-def retrieve_context(query: str, k: int = 3, session_id: str = None):
-    vectorstore = get_vectorstore()
-    
+def invalidate_session_cache(session_id: str):
+    retrieval_cache.pop(session_id)
+
+def forget_session(session_id: str):
+    """Drops every per-session RAG structure once the interview has ended."""
+    invalidate_session_cache(session_id)
+    vector_service.forget_session(session_id)
+
+class VectorStoreService:
+    """
+    Process-wide Pinecone vector store shared by every agent.
+    One index handle (and so one keep-alive HTTP connection pool) and one embedding
+    model are reused for all queries. Query time is split into embedding and network.
+    """
+    backend = "Pinecone"
+    # Pinecone often returns duplicates of high-scoring chunks, so callers over-fetch
+    returns_duplicates = True
+
+    def __init__(self, embedding, index_name: str, text_key_name: str = TEXT_KEY):
+        self.embedding = embedding
+        self.index_name = index_name
+        self.text_key_name = text_key_name
+        self.chunk_store = ChunkEmbeddingStore(EMBEDDING_STORE_PATH, EMBEDDING_MODEL)
+        self._store = None
+        self.metrics = {
+            "queries": 0,
+            "embed_ms": 0.0,
+            "network_ms": 0.0,
+            "upserts": 0,
+            "upsert_ms": 0.0,
+            "indexed_chunks": 0,
+            "index_embed_ms": 0.0,
+        }
+
+    @property
+    def store(self) -> PineconeVectorStore:
+        if self._store is None:
+            self._store = PineconeVectorStore(
+                index=get_pinecone_index(pool_threads=PINECONE_POOL_THREADS),
+                embedding=self.embedding,
+                text_key=self.text_key_name,
+            )
+        return self._store
+
+    async def warm_up(self):
+        """Loads the embedding model weights and opens the Pinecone connection."""
+        start = time.perf_counter()
+        await self.embedding.aembed_query("warm up")
+        await asyncio.to_thread(self.store.index.describe_index_stats)
+        print(f"[RAG] Vector store warmed up in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    async def similarity_search(self, query: str, k: int, session_id: str):
+        start = time.perf_counter()
+        vector = await self.embedding.aembed_query(query)
+        embedded = time.perf_counter()
+        docs = await self._search_by_vector(vector, k, session_id)
+        done = time.perf_counter()
+
+        embed_ms = (embedded - start) * 1000
+        network_ms = (done - embedded) * 1000
+        self.metrics["queries"] += 1
+        self.metrics["embed_ms"] += embed_ms
+        self.metrics["network_ms"] += network_ms
+        print(f"[RAG] Query took {embed_ms:.0f}ms embedding + {network_ms:.0f}ms {self.backend}")
+        return docs
+
+    async def _search_by_vector(self, vector: list, k: int, session_id: str):
+        filter_dict = {"session_id": {"$eq": session_id}}
+        return await self.store.asimilarity_search_by_vector(vector, k=k, filter=filter_dict)
+
+    @property
+    def document_embedder(self) -> Embeddings:
+        # Document chunks bypass the query cache so a large upload does not flush it
+        return self.embedding.inner if isinstance(self.embedding, CachedEmbeddings) else self.embedding
+
+    async def _upsert_vectors(self, texts: list, vectors: list, metadatas: list, ids: list):
+        records = [
+            {"id": id_, "values": vector, "metadata": {**(metadata or {}), self.text_key_name: text}}
+            for text, vector, metadata, id_ in zip(texts, vectors, metadatas, ids)
+        ]
+        await asyncio.to_thread(self.store.index.upsert, vectors=records)
+
+    async def add_texts(self, texts: list, metadatas: list = None, batch_size: int = EMBED_BATCH_SIZE):
+        """
+        Indexes chunks under "<session_id>:<content hash>". Every session owns its own
+        vectors, so concurrent uploads of the same document never write the same record;
+        what is shared across sessions is the embedding, served by the chunk store.
+        """
+        if not texts:
+            return
+        metadatas = metadatas or [{} for _ in texts]
+        session_id = metadatas[0].get("session_id")
+        prefix = f"{session_id}:" if session_id else ""
+        ids = [prefix + text_key(t) for t in texts]
+        await self._index(texts, metadatas, ids, batch_size)
+
+    async def _index(self, texts: list, metadatas: list, ids: list, batch_size: int):
+        """
+        Embeds texts in batches and upserts them, overlapping the upload of batch N
+        with the embedding of batch N+1. Embeddings of known chunks come from the chunk store.
+        """
+        if not texts:
+            return
+
+        start = time.perf_counter()
+        embed_ms = 0.0
+        upload = None
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i:i + batch_size]
+            embed_start = time.perf_counter()
+            vectors = await asyncio.to_thread(
+                self.chunk_store.embed, self.document_embedder, batch, [text_key(t) for t in batch]
+            )
+            embed_ms += (time.perf_counter() - embed_start) * 1000
+            if upload:
+                await upload
+            upload = asyncio.create_task(
+                self._upsert_vectors(batch, vectors, metadatas[i:i + batch_size], ids[i:i + batch_size])
+            )
+        await upload
+
+        elapsed = time.perf_counter() - start
+        self.metrics["upserts"] += 1
+        self.metrics["upsert_ms"] += elapsed * 1000
+        self.metrics["indexed_chunks"] += len(texts)
+        self.metrics["index_embed_ms"] += embed_ms
+        print(f"[RAG] Indexed {len(texts)} chunks in {elapsed:.2f}s ({len(texts) / elapsed:.0f} chunks/s, {embed_ms:.0f}ms embedding)")
+
+    def forget_session(self, session_id: str):
+        # Pinecone vectors stay in the shared index, only the local backend holds per-session state
+        pass
+
+    def get_metrics(self) -> dict:
+        queries = self.metrics["queries"] or 1
+        return {
+            **self.metrics,
+            "embedding_cache": self.embedding.cache.stats() if isinstance(self.embedding, CachedEmbeddings) else None,
+            "retrieval_cache": {**retrieval_stats, "sessions": len(retrieval_cache)},
+            "chunk_store": self.chunk_store.stats,
+            "avg_embed_ms": round(self.metrics["embed_ms"] / queries, 1),
+            "avg_network_ms": round(self.metrics["network_ms"] / queries, 1),
+        }
+
+class LocalVectorIndex(VectorStoreService):
+    """
+    In-process vector index for session-scoped documents.
+    Each session's chunk embeddings live in one normalized NumPy matrix (kept in memory,
+    or memory-mapped from LOCAL_INDEX_DIR) and queries run exact top-k dot products.
+    Chunks are deduplicated on insert, so no over-fetching is needed. Batches of an
+    upload are collected and merged into the matrix once per document, off the event loop.
+    """
+    backend = "local index"
+    returns_duplicates = False
+
+    def __init__(self, embedding, index_dir: str = None):
+        super().__init__(embedding, index_name="local")
+        self.index_dir = index_dir
+        self.sessions = {}  # session_id -> {"vectors": ndarray, "texts": [...], "metadatas": [...]}
+        self._pending = {}  # session_id -> [(vectors, texts, metadatas), ...] not merged yet
+        self._commit_lock = asyncio.Lock()
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+
+    def _paths(self, session_id: str):
+        base = os.path.join(self.index_dir, hashlib.sha256(session_id.encode("utf-8")).hexdigest())
+        return base + ".npy", base + ".json"
+
+    def _read(self, session_id: str):
+        vectors_path, meta_path = self._paths(session_id)
+        if not os.path.exists(vectors_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return {"vectors": np.load(vectors_path, mmap_mode="r"), **meta}
+
+    def _write(self, session_id: str, entry: dict):
+        # Written next to the live files and renamed over them, readers keep their old mapping
+        vectors_path, meta_path = self._paths(session_id)
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.save(f, entry["vectors"])
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"texts": entry["texts"], "metadatas": entry["metadatas"]}, f)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(meta_path + ".tmp", meta_path)
+        return np.load(vectors_path, mmap_mode="r")
+
+    async def _load(self, session_id: str):
+        entry = self.sessions.get(session_id)
+        if entry is None and self.index_dir:
+            entry = await asyncio.to_thread(self._read, session_id)
+            if entry is not None:
+                self.sessions.setdefault(session_id, entry)
+        return entry
+
+    async def warm_up(self):
+        start = time.perf_counter()
+        await self.embedding.aembed_query("warm up")
+        print(f"[RAG] Local index warmed up in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    async def _search_by_vector(self, vector: list, k: int, session_id: str):
+        entry = await self._load(session_id)
+        if entry is None or not len(entry["texts"]):
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        scores = entry["vectors"] @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [Document(page_content=entry["texts"][i], metadata=entry["metadatas"][i]) for i in top]
+
+    async def add_texts(self, texts: list, metadatas: list = None, batch_size: int = EMBED_BATCH_SIZE):
+        metadatas = metadatas or [{} for _ in texts]
+        session_id = metadatas[0].get("session_id") if metadatas else None
+        if not session_id:
+            raise ValueError("Local index requires a session_id in the chunk metadata")
+
+        # Skip chunks the session already holds
+        entry = await self._load(session_id)
+        known = {text_key(t) for t in entry["texts"]} if entry else set()
+        new = [(t, m) for t, m in zip(texts, metadatas) if text_key(t) not in known]
+        if new:
+            try:
+                await self._index([t for t, _ in new], [m for _, m in new], [text_key(t) for t, _ in new], batch_size)
+            finally:
+                await self._commit(session_id)
+
+    async def _upsert_vectors(self, texts: list, vectors: list, metadatas: list, ids: list):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        self._pending.setdefault(metadatas[0]["session_id"], []).append((vectors, list(texts), list(metadatas)))
+
+    async def _commit(self, session_id: str):
+        """Merges the pending batches of a session into its matrix in one step and persists it."""
+        async with self._commit_lock:
+            batches = self._pending.pop(session_id, [])
+            if not batches:
+                return
+            entry = await self._load(session_id)
+            parts = [batch[0] for batch in batches]
+            if entry is not None and len(entry["texts"]):
+                parts.insert(0, entry["vectors"])
+            entry = {
+                "vectors": np.vstack(parts),
+                "texts": (entry["texts"] if entry else []) + [t for batch in batches for t in batch[1]],
+                "metadatas": (entry["metadatas"] if entry else []) + [m for batch in batches for m in batch[2]],
+            }
+            if self.index_dir:
+                entry["vectors"] = await asyncio.to_thread(self._write, session_id, entry)
+            self.sessions[session_id] = entry
+
+    def forget_session(self, session_id: str):
+        self.sessions.pop(session_id, None)
+        self._pending.pop(session_id, None)
+        if self.index_dir:
+            for path in self._paths(session_id):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def get_metrics(self) -> dict:
+        return {**super().get_metrics(), "sessions": len(self.sessions)}
+
+def build_vector_service() -> VectorStoreService:
+    if RAG_BACKEND == "pinecone":
+        return VectorStoreService(embeddings, PINECONE_INDEX_NAME)
+    elif RAG_BACKEND == "local":
+        return LocalVectorIndex(embeddings, LOCAL_INDEX_DIR)
+    raise ValueError(f"Unknown RAG_BACKEND: {RAG_BACKEND}")
+
+vector_service = build_vector_service()
+
+async def retrieve_context(query: str, k: int = 3, session_id: str = None):
     # CRITICAL: Only retrieve documents from the CURRENT session
     if session_id:
-        filter_dict = {"session_id": {"$eq": session_id}}
-        print(f"[RAG] Retrieving with session filter: {filter_dict}")
+        print(f"[RAG] Retrieving for session: {session_id}")
+
+        session_cache = retrieval_cache.get(session_id)
+        if session_cache is None:
+            session_cache = LRUCache(RETRIEVAL_CACHE_SIZE)
+            retrieval_cache.put(session_id, session_cache)
+        cache_key = (text_key(query), k)
+        cached = session_cache.get(cache_key)
+        if cached is not None:
+            retrieval_stats["hits"] += 1
+            print(f"[RAG] Retrieval cache hit ({len(cached)} documents)")
+            return list(cached)
+        retrieval_stats["misses"] += 1
         
         # Request significantly more documents to ensure diversity
         # Pinecone often returns duplicates of high-scoring chunks
-        fetch_k = k * 10
-        raw_results = vectorstore.similarity_search(query, k=fetch_k, filter=filter_dict)
+        fetch_k = k * 10 if vector_service.returns_duplicates else k
+        raw_results = await vector_service.similarity_search(query, k=fetch_k, session_id=session_id)
         
         print(f"[RAG] Retrieved {len(raw_results)} raw documents (requested {fetch_k})")
         
@@ -37,7 +465,7 @@ def retrieve_context(query: str, k: int = 3, session_id: str = None):
         
         for doc in raw_results:
             # Use content as the source of truth for uniqueness
-            content_hash = hash(doc.page_content.strip())
+            content_hash = text_key(doc.page_content)
             
             if content_hash not in seen_hashes:
                 seen_hashes.add(content_hash)
@@ -48,66 +476,48 @@ def retrieve_context(query: str, k: int = 3, session_id: str = None):
                 break
         
         print(f"[RAG] Returning {len(unique_results)} unique documents after deduplication")
-        
-        return unique_results
+
+        session_cache.put(cache_key, unique_results)
+        return list(unique_results)
     else:
         # If no session_id, don't retrieve anything to avoid contamination
         print("[RAG] WARNING: No session_id provided, returning empty results")
         return []
 
-def index_text(text: str, metadata: dict = None):
-    text_splitter = RecursiveCharacterTextSplitter(
+def make_text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
         chunk_size=800,        # Reduced to fit MiniLM-L6-v2 limit better (256 tokens)
         chunk_overlap=50,
         length_function=len,
         separators=["\n\n\n", "\n\n", "\n", ". ", " ", ""]
     )
-    chunks = text_splitter.split_text(text)
+
+def split_chunks(text: str) -> list:
+    chunks = make_text_splitter().split_text(text)
     
     
     # Deduplicate chunks (remove exact duplicates)
     unique_chunks = []
     seen = set()
     for chunk in chunks:
-        chunk_hash = hash(chunk.strip())
+        chunk_hash = text_key(chunk)
         if chunk_hash not in seen:
             seen.add(chunk_hash)
             unique_chunks.append(chunk)
-    
+    return unique_chunks
+
+async def index_chunks(unique_chunks: list, metadata: dict = None):
     print(f"[RAG] Indexing {len(unique_chunks)} unique chunks")
     
-    vectorstore = get_vectorstore()
     if unique_chunks:
-        import uuid
-        # Generate explicit IDs to ensure uniqueness and traceability
-        ids = [str(uuid.uuid4()) for _ in unique_chunks]
-        
         # Create metadata list with COPIES to avoid shared reference bug
         metadatas_list = [metadata.copy() for _ in unique_chunks] if metadata else None
         
-        print(f"[RAG] Adding {len(unique_chunks)} chunks to Pinecone")
-        vectorstore.add_texts(unique_chunks, metadatas=metadatas_list, ids=ids)
-        print(f"[RAG] Successfully added chunks to Pinecone")
-
-async def process_and_index_document(file_content: bytes, filename: str, metadata: dict = None):
-    from pypdf import PdfReader
-    import io
-
-    text = ""
-    if filename.lower().endswith('.pdf'):
-        try:
-            reader = PdfReader(io.BytesIO(file_content))
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-        except Exception as e:
-            print(f"Error reading PDF: {e}")
-            return
-    else:
-        # Assume text
-        try:
-            text = file_content.decode('utf-8')
-        except:
-            text = file_content.decode('latin-1')
-            
-    if text.strip():
-        index_text(text, metadata)
+        print(f"[RAG] Adding {len(unique_chunks)} chunks to {vector_service.backend}")
+        # IDs are content hashes, so identical chunks map to the same vector across sessions
+        await vector_service.add_texts(unique_chunks, metadatas=metadatas_list)
+        print(f"[RAG] Successfully added chunks to {vector_service.backend}")
+
+        # Cached results for this session no longer reflect its documents
+        if metadata and metadata.get("session_id"):
+            invalidate_session_cache(metadata["session_id"])
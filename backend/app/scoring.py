@@ -0,0 +1,80 @@
+"""
+Background answer scoring (GRAPH_ASYNC_SCORING=1).
+
+The score_dispatch node hands each answer to this queue and the graph moves straight
+on to the next question. Evaluations run as tasks on a bounded pool, each one is
+persisted to the evaluations table by evaluation_agent as it completes. Completed
+scores are held per session until strategy collects them into state.evaluations,
+which it only waits for when a decision (or the final feedback) actually needs them.
+Scores live in this process, multi-worker deployments need sticky sessions
+(see DEPLOYMENT.md, "Running Several Workers").
+"""
+import asyncio
+import os
+import time
+
+# Return the next question without waiting for the answer's score
+GRAPH_ASYNC_SCORING = os.getenv("GRAPH_ASYNC_SCORING", "0") == "1"
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "8"))
+
+
+class ScoringQueue:
+    def __init__(self, workers: int):
+        self._workers = asyncio.Semaphore(workers)
+        self._tasks = {}  # session_id -> [task, ...] in answer order
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "waits": 0, "wait_ms": 0.0}
+
+    def submit(self, session_id: str, score_fn, state):
+        """Schedules score_fn(state) -> {"evaluations": [...]} for the session's latest answer."""
+        self.stats["submitted"] += 1
+        task = asyncio.create_task(self._run(score_fn, state))
+        self._tasks.setdefault(session_id, []).append(task)
+
+    async def _run(self, score_fn, state) -> list:
+        async with self._workers:
+            try:
+                result = await score_fn(state)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"[SCORING] Evaluation failed: {e}")
+                return []
+        self.stats["completed"] += 1
+        return result.get("evaluations", [])
+
+    def pending(self, session_id: str) -> int:
+        return sum(1 for task in self._tasks.get(session_id, []) if not task.done())
+
+    async def collect(self, session_id: str, wait: bool = False) -> list:
+        """
+        Returns the finished evaluations not collected yet, in answer order.
+        Stops at the first unfinished one unless `wait` is set, then waits for all.
+        """
+        tasks = self._tasks.get(session_id, [])
+        if wait and any(not task.done() for task in tasks):
+            started = time.perf_counter()
+            await asyncio.wait(tasks)
+            waited_ms = (time.perf_counter() - started) * 1000
+            self.stats["waits"] += 1
+            self.stats["wait_ms"] += waited_ms
+            print(f"[SCORING] Waited {waited_ms:.0f}ms for {session_id} scores")
+
+        evaluations = []
+        while tasks and tasks[0].done():
+            evaluations.extend(tasks.pop(0).result())
+        if not tasks:
+            self._tasks.pop(session_id, None)
+        return evaluations
+
+    def forget(self, session_id: str):
+        for task in self._tasks.pop(session_id, []):
+            task.cancel()
+
+    def get_metrics(self) -> dict:
+        return {
+            **self.stats,
+            "wait_ms": round(self.stats["wait_ms"], 1),
+            "pending": sum(self.pending(session_id) for session_id in self._tasks),
+        }
+
+
+scoring_queue = ScoringQueue(SCORING_WORKERS)
@@ -0,0 +1,119 @@
+"""
+Speculative work done while the student is still answering (SPECULATIVE_PREFETCH=1).
+
+As soon as a transcript is known (/api/transcribe or a finished transcript stream, which
+usually comes well before the student presses submit) the evaluation and examiner RAG
+lookups for that answer are started in the background. When the answer is submitted,
+the retrieval helpers take the speculative result if it was computed for exactly the
+same query, otherwise it is cancelled and counted as a miss. Results nobody takes within
+SPECULATION_TTL_SECONDS (e.g. the student abandoned the interview) are dropped. The fixed
+persona phrases are synthesized into the TTS cache at startup. Results live in this
+process, multi-worker deployments need sticky sessions (see DEPLOYMENT.md,
+"Running Several Workers").
+"""
+import asyncio
+import os
+import time
+from typing import Optional
+
+from .rag import text_key
+
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "0") == "1"
+SPECULATION_TTL_SECONDS = int(os.getenv("SPECULATION_TTL_SECONDS", "600"))
+
+# Listener-persona acknowledgements (see EXAMINER_PERSONA_LISTENER), spoken verbatim often
+PERSONA_PHRASES = [
+    "Please go on.",
+    "I am listening.",
+    "Understood, continue.",
+    "Thank you for the presentation. I have a few questions.",
+]
+
+
+class Speculator:
+    def __init__(self):
+        self._tasks = {}  # (session_id, kind) -> (query key, task, started at)
+        self._background = set()  # tasks of `schedule`, referenced until they finish
+        self.stats = {"started": 0, "hits": 0, "misses": 0, "discarded": 0, "expired": 0, "failed": 0, "phrases_warmed": 0}
+
+    def schedule(self, coro):
+        """Runs `coro` (typically one that calls `start`) without making the caller wait for it."""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def start(self, session_id: str, kind: str, query: str, coro):
+        """Runs `coro` in the background as the speculative result for (session, kind, query)."""
+        self._expire()
+        self._cancel(session_id, kind)
+        self._tasks[(session_id, kind)] = (text_key(query), asyncio.create_task(coro), time.monotonic())
+        self.stats["started"] += 1
+
+    def _expire(self):
+        cutoff = time.monotonic() - SPECULATION_TTL_SECONDS
+        for key in [k for k, entry in self._tasks.items() if entry[2] < cutoff]:
+            self._tasks.pop(key)[1].cancel()
+            self.stats["expired"] += 1
+
+    def _cancel(self, session_id: str, kind: str):
+        entry = self._tasks.pop((session_id, kind), None)
+        if entry:
+            entry[1].cancel()
+            self.stats["discarded"] += 1
+
+    async def take(self, session_id: str, kind: str, query: str) -> Optional[str]:
+        """Returns the speculative result if it was computed for this query, else None."""
+        entry = self._tasks.pop((session_id, kind), None)
+        if entry is None:
+            return None
+        key, task, started = entry
+        if time.monotonic() - started > SPECULATION_TTL_SECONDS:
+            task.cancel()
+            self.stats["expired"] += 1
+            return None
+        if key != text_key(query):
+            task.cancel()
+            self.stats["misses"] += 1
+            print(f"[SPECULATION] {kind} miss for {session_id}, answer changed")
+            return None
+        try:
+            result = await task
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"[SPECULATION] {kind} prefetch failed: {e}")
+            return None
+        self.stats["hits"] += 1
+        print(f"[SPECULATION] {kind} hit for {session_id}")
+        return result
+
+    def discard(self, session_id: str):
+        for session, kind in [k for k in self._tasks if k[0] == session_id]:
+            self._cancel(session, kind)
+
+    async def warm_phrases(self, voices: list):
+        """Synthesizes the persona phrases for every voice into the audio cache."""
+        from .tts import split_sentences, synthesize_sentence
+        from .audio_cache import audio_cache
+        for voice in voices:
+            for phrase in PERSONA_PHRASES:
+                for sentence in split_sentences(phrase):
+                    if await audio_cache.get(voice, sentence) is not None:
+                        continue
+                    try:
+                        await synthesize_sentence(sentence, voice)
+                        self.stats["phrases_warmed"] += 1
+                    except Exception as e:
+                        print(f"[SPECULATION] Could not pre-synthesize '{sentence}': {e}")
+                        return
+
+    def get_metrics(self) -> dict:
+        resolved = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": SPECULATIVE_PREFETCH,
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / resolved, 3) if resolved else 0.0,
+            "in_flight": len(self._tasks),
+        }
+
+
+speculator = Speculator()
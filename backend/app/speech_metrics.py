@@ -0,0 +1,137 @@
+"""
+Speech analytics for answer transcripts.
+
+Fillers (including multi-word ones like "you know") are matched in one pass with a
+single compiled regex over the whole transcript. Pause, speaking-rate and articulation
+stats are computed from segment timestamps with NumPy, so an hour-long presentation
+transcript is analyzed in milliseconds.
+"""
+import os
+import re
+from typing import Optional
+
+import numpy as np
+
+FILLERS = ["um", "uh", "ah", "like", "you know", "sort of", "kind of"]
+# Gaps between segments longer than this count as pauses
+PAUSE_THRESHOLD_SECONDS = float(os.getenv("PAUSE_THRESHOLD_SECONDS", "0.5"))
+# Rough speaking time per word when no audio timing is available
+SECONDS_PER_WORD = 0.5
+
+
+def compile_fillers(fillers: list) -> re.Pattern:
+    # Longest phrases first so "kind of" wins over any single-word prefix
+    phrases = sorted(fillers, key=len, reverse=True)
+    alternation = "|".join(r"\s+".join(map(re.escape, p.split())) for p in phrases)
+    # Matched against lowercased text, which is faster than re.IGNORECASE
+    return re.compile(rf"\b(?:{alternation.lower()})\b")
+
+
+FILLER_PATTERN = compile_fillers(FILLERS)
+
+
+def _normalize_filler(match: str) -> str:
+    return " ".join(match.split())
+
+
+def count_fillers(text: str) -> dict:
+    counts = {}
+    for match in FILLER_PATTERN.findall(text.lower()):
+        filler = _normalize_filler(match)
+        counts[filler] = counts.get(filler, 0) + 1
+    return counts
+
+
+def _segment_arrays(segments: list):
+    starts = np.fromiter((seg.start if hasattr(seg, "start") else seg["start"] for seg in segments), dtype=np.float64, count=len(segments))
+    ends = np.fromiter((seg.end if hasattr(seg, "end") else seg["end"] for seg in segments), dtype=np.float64, count=len(segments))
+    texts = [seg.text if hasattr(seg, "text") else seg["text"] for seg in segments]
+    return starts, ends, texts
+
+
+def _rate(words, seconds):
+    """Words per minute, 0 where there is no time to divide by."""
+    seconds = np.asarray(seconds, dtype=np.float64)
+    return np.divide(words * 60.0, seconds, out=np.zeros_like(seconds), where=seconds > 0)
+
+
+def analyze_speech(text: str, segments: Optional[list] = None, duration: Optional[float] = None,
+                   per_segment: bool = False) -> dict:
+    """
+    Returns filler, pause and rate metrics for a transcript.
+    `segments` are Whisper-style segments (dicts or SpeechSegment) with start/end/text.
+    Without them, pauses are unknown and the duration is estimated from the word count.
+    """
+    segments = segments or []
+    word_count = len(text.split())
+    fillers = count_fillers(text)
+    hesitation_count = sum(fillers.values())
+
+    metrics = {
+        "word_count": word_count,
+        "hesitation_count": hesitation_count,
+        "filler_counts": fillers,
+        "pause_count": 0,
+        "pause_duration_ms": 0,
+        "longest_pause_ms": 0,
+        "mean_pause_ms": 0,
+    }
+
+    if not segments:
+        duration = duration or word_count * SECONDS_PER_WORD
+        metrics["wpm"] = int(_rate(word_count, duration))
+        metrics["articulation_wpm"] = metrics["wpm"]
+        return metrics
+
+    starts, ends, texts = _segment_arrays(segments)
+    gaps = starts[1:] - ends[:-1]
+    pauses = gaps[gaps > PAUSE_THRESHOLD_SECONDS]
+    spoken_seconds = float(np.clip(ends - starts, 0, None).sum())
+    duration = duration or float(ends.max() - starts.min())
+
+    metrics.update({
+        "pause_count": int(pauses.size),
+        "pause_duration_ms": int(pauses.sum() * 1000),
+        "longest_pause_ms": int(pauses.max() * 1000) if pauses.size else 0,
+        "mean_pause_ms": int(pauses.mean() * 1000) if pauses.size else 0,
+        "wpm": int(_rate(word_count, duration)),
+        # Rate while actually speaking, pauses excluded
+        "articulation_wpm": int(_rate(word_count, spoken_seconds)),
+    })
+
+    if per_segment:
+        metrics["segments"] = _segment_breakdown(starts, ends, texts, gaps)
+    return metrics
+
+
+def _segment_breakdown(starts, ends, texts, gaps) -> list:
+    # Scan all segment texts in one pass and map each filler back to its segment
+    joined = "\n".join(texts).lower()
+    bounds = np.cumsum([len(t) + 1 for t in texts])
+    filler_positions = np.fromiter((m.start() for m in FILLER_PATTERN.finditer(joined)), dtype=np.int64)
+    filler_counts = np.bincount(np.searchsorted(bounds, filler_positions, side="right"), minlength=len(texts))
+    word_counts = np.array([len(t.split()) for t in texts], dtype=np.int64)
+    rates = _rate(word_counts, ends - starts)
+    # Pause before each segment, the first one has none
+    pauses_before = np.concatenate(([0.0], np.where(gaps > PAUSE_THRESHOLD_SECONDS, gaps, 0.0)))
+
+    return [
+        {
+            "start": round(float(starts[i]), 3),
+            "end": round(float(ends[i]), 3),
+            "word_count": int(word_counts[i]),
+            "hesitation_count": int(filler_counts[i]),
+            "wpm": int(rates[i]),
+            "pause_before_ms": int(pauses_before[i] * 1000),
+        }
+        for i in range(len(texts))
+    ]
+
+
+def confidence_level(metrics: dict) -> str:
+    # Low if many hesitations OR long pauses
+    if metrics["hesitation_count"] > 4 or metrics["pause_duration_ms"] > 3000:
+        return "Low"
+    if metrics["hesitation_count"] > 2 or metrics["pause_duration_ms"] > 1000:
+        return "Medium"
+    return "High"
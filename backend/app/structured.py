@@ -0,0 +1,122 @@
+"""
+Structured output for the JSON-producing agents (evaluation, assess, feedback).
+
+Model output is parsed tolerantly: code fences, prose around the object and trailing
+commas are stripped before json.loads. The result is validated against a Pydantic
+model. Only if that still fails is a small, fast model asked to repair the output,
+at most STRUCTURED_REPAIR_ATTEMPTS times, so a malformed 70B response costs a cheap
+8B round trip instead of a wasted turn.
+"""
+import json
+import os
+import re
+from typing import Optional, Type
+
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, ValidationError
+
+from .prompts import REPAIR_PROMPT
+from .llm import get_llm
+
+STRUCTURED_REPAIR_ATTEMPTS = int(os.getenv("STRUCTURED_REPAIR_ATTEMPTS", "1"))
+
+repair_llm = get_llm("llama3.1-8b")
+repair_chain = ChatPromptTemplate.from_template(REPAIR_PROMPT) | repair_llm
+
+FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+structured_stats = {"parsed": 0, "repaired": 0, "failed": 0}
+
+
+def _first_object(text: str) -> Optional[str]:
+    """The first balanced {...} in text, skipping braces inside strings."""
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        in_string = escaped = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start:i + 1]
+        start = text.find("{", start + 1)
+    return None
+
+
+def extract_json(text: str) -> Optional[dict]:
+    """Returns the JSON object in a model response, or None if there is none."""
+    candidates = [text.strip()]
+    fenced = FENCE.search(text)
+    if fenced:
+        candidates.append(fenced.group(1).strip())
+    embedded = _first_object(text)
+    if embedded:
+        candidates.append(embedded)
+    for candidate in candidates:
+        for attempt in (candidate, TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                data = json.loads(attempt)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict):
+                return data
+    return None
+
+
+def _validate(text: str, model: Type[BaseModel], data: Optional[dict] = None):
+    if data is None:
+        data = extract_json(text)
+    if data is None:
+        return None, "No JSON object found in the output."
+    try:
+        return model.model_validate(data), None
+    except ValidationError as e:
+        return None, str(e)
+
+
+async def parse_structured(text: str, model: Type[BaseModel], agent: str,
+                           data: Optional[dict] = None) -> Optional[BaseModel]:
+    """
+    Parses and validates `text` as `model`, repairing it with the small model if needed.
+    `data` is the object already extracted from `text`, for callers validating one
+    response against several models. Returns None when the output could not be salvaged
+    within the retry budget.
+    """
+    result, error = _validate(text, model, data)
+    if result is not None:
+        structured_stats["parsed"] += 1
+        return result
+
+    for attempt in range(STRUCTURED_REPAIR_ATTEMPTS):
+        print(f"[STRUCTURED] {agent} output invalid, repair attempt {attempt + 1}: {error[:200]}")
+        try:
+            response = await repair_chain.ainvoke({
+                "schema": json.dumps(model.model_json_schema()),
+                "errors": error,
+                "output": text
+            })
+        except Exception as e:
+            print(f"[STRUCTURED] {agent} repair call failed: {e}")
+            break
+        text = response.content
+        result, error = _validate(text, model)
+        if result is not None:
+            structured_stats["repaired"] += 1
+            return result
+
+    structured_stats["failed"] += 1
+    print(f"[STRUCTURED] {agent} output could not be parsed")
+    return None
@@ -1,56 +1,71 @@
-from groq import Groq
+from groq import AsyncGroq
 import os
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# One async client for the whole process so the HTTP connection pool is reused
+client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
 
-import shutil
-import tempfile
+# Groq rejects audio uploads above 25 MB
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(25 * 1024 * 1024)))
+READ_CHUNK_BYTES = 256 * 1024
 
-def transcribe_audio(audio_file):
+class AudioTooLarge(ValueError):
+    pass
+
+async def read_audio(audio_file, limit: int = MAX_AUDIO_BYTES) -> bytes:
+    """
+    Reads an UploadFile into memory, refusing it as soon as it is known to exceed `limit`.
+    """
+    if audio_file.size is not None and audio_file.size > limit:
+        raise AudioTooLarge(f"Audio exceeds {limit} bytes")
+
+    parts = []
+    size = 0
+    while True:
+        chunk = await audio_file.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            raise AudioTooLarge(f"Audio exceeds {limit} bytes")
+        parts.append(chunk)
+    return b"".join(parts)
+
+async def transcribe_audio(audio_file):
     """
     Transcribes audio using Groq Whisper.
     :param audio_file: UploadFile object from FastAPI
     :return: dict with 'text' or empty dict on failure
+    :raises AudioTooLarge: if the upload is above MAX_AUDIO_BYTES
+    """
+    audio = await read_audio(audio_file)
+    print(f"🎤 Audio File Size: {len(audio)} bytes")
+
+    # Avoid sending empty/silent files
+    if len(audio) < 100:
+        print("⚠️ Audio file is too small (silent/empty).")
+        return {"text": ""}
+
+    return await transcribe_bytes(audio, audio_file.filename)
+
+async def transcribe_bytes(audio: bytes, filename: str = None) -> dict:
     """
-    tmp_path = None
+    Sends in-memory audio to Groq Whisper, returns the verbose_json dict or {} on failure.
+    """
+    # Use .webm as default since that's what we send from frontend, but respect valid extensions
+    filename = filename or "audio.webm"
+    if not os.path.splitext(filename)[1]:
+        filename += ".webm"
+
     try:
-        # 1. Save Audio Temporarily
-        # Use .webm as default since that's what we send from frontend, but respect valid extensions
-        suffix = os.path.splitext(audio_file.filename)[1] or ".webm"
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            shutil.copyfileobj(audio_file.file, tmp)
-            tmp_path = tmp.name
-            
-        # 2. Check File Size (Avoid sending empty/silent files)
-        file_size = os.path.getsize(tmp_path)
-        print(f"🎤 Audio File Size: {file_size} bytes")
-        
-        if file_size < 100:
-            print("⚠️ Audio file is too small (silent/empty).")
-            return {"text": ""}
-
-        # 3. Transcribe via Groq
-        with open(tmp_path, "rb") as file:
-            transcription = client.audio.transcriptions.create(
-                file=(tmp_path, file.read()), # Filename + Bytes
-                model="whisper-large-v3",
-                response_format="verbose_json",
-                language="en",
-                temperature=0.0
-            )
-        
-        # Cleanup
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
-            
+        transcription = await client.audio.transcriptions.create(
+            file=(filename, audio), # Filename + Bytes
+            model="whisper-large-v3",
+            response_format="verbose_json",
+            timestamp_granularities=["word", "segment"],
+            language="en",
+            temperature=0.0
+        )
         return transcription.to_dict()
-
     except Exception as e:
         print(f"Transcription error: {e}")
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except:
-                pass
         return {}
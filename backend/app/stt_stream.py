@@ -0,0 +1,149 @@
+"""
+Incremental transcription for long (presentation-mode) answers.
+
+The client records in short, independently decodable segments (e.g. restarting
+MediaRecorder every few seconds) that overlap the previous one by a second or two,
+and uploads each with its start offset while the student keeps talking. Segments are
+transcribed concurrently on a bounded pool and stitched in order into one running
+transcript with absolute segment timestamps. Segments inside the overlap are dropped
+by timestamp and the one straddling the seam is trimmed by matching its leading words
+against the transcript tail. When the speaker stops, only the last segment is still
+outstanding. Streams live in this process, multi-worker deployments need sticky
+sessions (see DEPLOYMENT.md, "Running Several Workers").
+"""
+import asyncio
+import os
+import time
+import uuid
+from typing import Optional
+
+from .stt import transcribe_bytes
+
+STT_STREAM_WORKERS = int(os.getenv("STT_STREAM_WORKERS", "4"))
+# Streams nobody touched for this long are dropped
+STT_STREAM_TTL_SECONDS = int(os.getenv("STT_STREAM_TTL_SECONDS", "1800"))
+# Longest run of words compared when trimming the overlap between two windows
+MAX_SEAM_WORDS = 8
+
+_workers = asyncio.Semaphore(STT_STREAM_WORKERS)
+
+
+def _normalize(word: str) -> str:
+    return word.lower().strip(".,!?;:\"'")
+
+
+def _seam_overlap(previous: list, current: list) -> int:
+    """Number of leading words of `current` that repeat the tail of `previous`."""
+    for n in range(min(MAX_SEAM_WORDS, len(previous), len(current)), 0, -1):
+        if [_normalize(w) for w in previous[-n:]] == [_normalize(w) for w in current[:n]]:
+            return n
+    return 0
+
+
+class TranscriptStream:
+    def __init__(self, stream_id: str, session_id: Optional[str] = None):
+        self.stream_id = stream_id
+        self.session_id = session_id  # viva session the answer belongs to, if known
+        self.segments = []  # stitched, with absolute timestamps
+        self.duration = 0.0
+        self._results = {}  # index -> (offset, verbose_json)
+        self._tasks = {}
+        self._next_index = 0
+        self._next_stitch = 0
+        self.failed_segments = 0
+        self.touched_at = time.time()
+
+    def add(self, audio: bytes, offset: float, index: Optional[int] = None, filename: str = None) -> int:
+        if index is None:
+            index = self._next_index
+        self._next_index = max(self._next_index, index + 1)
+        self.touched_at = time.time()
+        self._tasks[index] = asyncio.create_task(self._transcribe(index, audio, offset, filename))
+        return index
+
+    async def _transcribe(self, index: int, audio: bytes, offset: float, filename: str):
+        async with _workers:
+            result = await transcribe_bytes(audio, filename)
+        if not result:
+            self.failed_segments += 1
+        self._results[index] = (offset, result or {})
+        self._stitch()
+
+    def _stitch(self):
+        # Segments can finish out of order, only stitch the contiguous prefix
+        while self._next_stitch in self._results:
+            offset, result = self._results.pop(self._next_stitch)
+            self._tasks.pop(self._next_stitch, None)
+            self._next_stitch += 1
+            self._merge(offset, result)
+
+    def _merge(self, offset: float, result: dict):
+        for seg in result.get("segments") or []:
+            covered_until = self.segments[-1]["end"] if self.segments else 0.0
+            start = offset + seg["start"]
+            end = offset + seg["end"]
+            # Drop segments that lie entirely inside the overlap with the previous window
+            if end <= covered_until:
+                continue
+            words = seg["text"].split()
+            if start < covered_until and self.segments:
+                # Straddles the seam: trim the words the previous window already has
+                repeated = _seam_overlap(self.segments[-1]["text"].split(), words)
+                if not repeated:
+                    repeated = round(len(words) * (covered_until - start) / max(end - start, 1e-6))
+                words = words[repeated:]
+            if words:
+                self.segments.append({"start": round(max(start, covered_until), 3), "end": round(end, 3), "text": " ".join(words)})
+        self.duration = max(self.duration, offset + (result.get("duration") or 0.0))
+
+    @property
+    def text(self) -> str:
+        return " ".join(seg["text"] for seg in self.segments)
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def to_dict(self) -> dict:
+        return {
+            "stream_id": self.stream_id,
+            "text": self.text,
+            "segments": self.segments,
+            "duration": round(self.duration, 3),
+            "pending_segments": self.pending,
+            "failed_segments": self.failed_segments,
+        }
+
+    async def finish(self) -> dict:
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        # Skip indexes that never arrived so the rest still gets stitched
+        while self._results:
+            self._next_stitch = min(self._results)
+            self._stitch()
+        return self.to_dict()
+
+
+class TranscriptStreams:
+    def __init__(self):
+        self.streams = {}
+
+    def create(self, session_id: Optional[str] = None) -> TranscriptStream:
+        self._prune()
+        stream = TranscriptStream(str(uuid.uuid4()), session_id)
+        self.streams[stream.stream_id] = stream
+        return stream
+
+    def get(self, stream_id: str) -> Optional[TranscriptStream]:
+        return self.streams.get(stream_id)
+
+    def pop(self, stream_id: str) -> Optional[TranscriptStream]:
+        return self.streams.pop(stream_id, None)
+
+    def _prune(self):
+        cutoff = time.time() - STT_STREAM_TTL_SECONDS
+        for stream_id, stream in list(self.streams.items()):
+            if stream.touched_at < cutoff and not stream.pending:
+                del self.streams[stream_id]
+
+
+transcript_streams = TranscriptStreams()
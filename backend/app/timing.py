@@ -0,0 +1,33 @@
+"""
+Per-node timing for the LangGraph pipeline.
+Every node is wrapped with `timed_node`, durations are logged and aggregated in
+`node_timings` (served on /api/metrics) so the critical path of /api/answer can be compared.
+"""
+import functools
+import time
+
+node_timings = {}
+
+def record_timing(name: str, elapsed_ms: float):
+    stats = node_timings.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+    stats["count"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+def timed_node(name: str, fn):
+    @functools.wraps(fn)
+    async def wrapper(state):
+        start = time.perf_counter()
+        try:
+            return await fn(state)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            record_timing(name, elapsed_ms)
+            print(f"[TIMING] {name} took {elapsed_ms:.0f}ms")
+    return wrapper
+
+def get_timings() -> dict:
+    return {
+        name: {**stats, "avg_ms": round(stats["total_ms"] / stats["count"], 1)}
+        for name, stats in node_timings.items()
+    }
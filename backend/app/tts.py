@@ -1,6 +1,8 @@
 import edge_tts
-import uuid
-import os
+import asyncio
+import re
+from typing import AsyncIterator
+from .audio_cache import audio_cache, clip_key
 
 # Voice Mappings
 VOICE_MAP = {
@@ -10,18 +12,72 @@ VOICE_MAP = {
     "Listener": "en-US-GuyNeural"          # Default for listener mode
 }
 
-OUTPUT_DIR = "/tmp/audio"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+DEFAULT_VOICE = "en-GB-SoniaNeural"
 
-async def generate_speech_file(text: str, strictness: str) -> str:
+# Split after sentence punctuation followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+def get_voice(strictness: str) -> str:
+    return VOICE_MAP.get(strictness, DEFAULT_VOICE)
+
+def split_sentences(text: str) -> list:
+    return [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s.strip()]
+
+async def stream_sentence(sentence: str, voice: str) -> AsyncIterator[bytes]:
+    """
+    Yields MP3 frames for one sentence as edge-tts produces them, and caches the clip.
+    """
+    parts = []
+    communicate = edge_tts.Communicate(sentence, voice)
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            parts.append(chunk["data"])
+            yield chunk["data"]
+    await audio_cache.put(voice, sentence, b"".join(parts))
+
+async def synthesize_sentence(sentence: str, voice: str) -> bytes:
+    return b"".join([data async for data in stream_sentence(sentence, voice)])
+
+async def lookup_speech(text: str, strictness: str) -> list:
+    """Returns the cached clip (or None) for every sentence of the text."""
+    voice = get_voice(strictness)
+    return [await audio_cache.get(voice, sentence) for sentence in split_sentences(text) or [text]]
+
+def speech_etag(text: str, strictness: str) -> str:
+    return clip_key(get_voice(strictness), text)
+
+async def synthesize_speech(text: str, strictness: str, clips: list = None) -> bytes:
+    return b"".join([data async for data in stream_speech(text, strictness, clips)])
+
+async def stream_speech(text: str, strictness: str, clips: list = None) -> AsyncIterator[bytes]:
     """
-    Generates an MP3 file using Edge TTS and returns the file path.
+    Streams MP3 audio for the text, no temp files are written.
+    Cached sentences are served from the audio cache. The first uncached sentence is
+    streamed frame by frame so playback can start right away, each following one is
+    synthesized one step ahead while the previous one plays out.
     """
-    voice = VOICE_MAP.get(strictness, "en-GB-SoniaNeural")
-    filename = f"{uuid.uuid4()}.mp3"
-    filepath = os.path.join(OUTPUT_DIR, filename)
-    
-    communicate = edge_tts.Communicate(text, voice)
-    await communicate.save(filepath)
-    
-    return filepath
+    voice = get_voice(strictness)
+    sentences = split_sentences(text) or [text]
+    if clips is None:
+        clips = await lookup_speech(text, strictness)
+
+    def start(i):
+        if i < len(sentences) and clips[i] is None:
+            return asyncio.create_task(synthesize_sentence(sentences[i], voice))
+        return None
+
+    ahead = None
+    try:
+        for i, sentence in enumerate(sentences):
+            current = ahead
+            ahead = start(i + 1)
+            if clips[i] is not None:
+                yield clips[i]
+            elif current is None:
+                async for data in stream_sentence(sentence, voice):
+                    yield data
+            else:
+                yield await current
+    finally:
+        if ahead:
+            ahead.cancel()
@@ -0,0 +1,80 @@
+"""
+Latency comparison: evaluation + strategy (two 70B calls) vs the merged assess call.
+
+Calls the models directly with a sample question/answer, the same way the graph nodes
+do, and reports per-path latency and prompt tokens. Needs CEREBRAS_API_KEY.
+The strategy call is always made here (as with STRATEGY_MODE=llm), so this is the
+worst case of the two-call path; in hybrid mode the rules skip it on most turns.
+
+Usage:
+    python bench_assess.py --rounds 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from langchain_core.prompts import ChatPromptTemplate
+from app.prompts import EVALUATION_PROMPT, STRATEGY_PROMPT, ASSESS_PROMPT
+from app.agents.evaluation import llm as evaluation_llm
+from app.agents.strategy import llm as strategy_llm
+from app.agents.assess import llm as assess_llm
+from app.structured import extract_json
+from app.context import evaluation_digest
+
+CONTEXT = "REST (Representational State Transfer) is an architectural style for networked applications. " \
+          "It relies on stateless client-server communication, uniform interfaces and cacheable responses."
+QUESTION = "What does it mean for a REST API to be stateless?"
+ANSWER = "Um, it means the server doesn't keep, like, session state between requests, so each request " \
+         "has to carry everything needed to handle it, for example the auth token."
+
+
+def input_tokens(response) -> int:
+    return (getattr(response, "usage_metadata", None) or {}).get("input_tokens", 0)
+
+
+async def two_calls() -> tuple:
+    evaluation = await (ChatPromptTemplate.from_template(EVALUATION_PROMPT) | evaluation_llm).ainvoke(
+        {"context": CONTEXT, "question": QUESTION, "answer": ANSWER})
+    strategy = await (ChatPromptTemplate.from_template(STRATEGY_PROMPT) | strategy_llm).ainvoke({
+        "history": str([{"role": "ai", "content": QUESTION}, {"role": "human", "content": ANSWER}]),
+        "num_questions": 3,
+        "scores": evaluation.content,
+        "topic": "REST APIs",
+        "strictness": "Moderate",
+    })
+    return input_tokens(evaluation) + input_tokens(strategy), strategy.content.strip()
+
+
+async def merged_call() -> tuple:
+    response = await (ChatPromptTemplate.from_template(ASSESS_PROMPT) | assess_llm).ainvoke({
+        "context": CONTEXT, "question": QUESTION, "answer": ANSWER, "topic": "REST APIs",
+        "strictness": "Moderate", "num_questions": 3, "scores": evaluation_digest([]),
+    })
+    return input_tokens(response), (extract_json(response.content) or {}).get("next_action")
+
+
+async def run(label: str, fn, rounds: int):
+    latencies = []
+    tokens = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        tokens, action = await fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<22} avg {statistics.mean(latencies):7.0f} ms  p50 {statistics.median(latencies):7.0f} ms  "
+          f"max {max(latencies):7.0f} ms  input tokens {tokens}  last action {action}")
+
+
+async def main(rounds: int):
+    await run("evaluation + strategy", two_calls, rounds)
+    await run("assess (merged)", merged_call, rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds))
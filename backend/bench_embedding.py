@@ -0,0 +1,69 @@
+"""
+Indexing throughput benchmark.
+
+Scales the sample text from debug_chunking.py to ~1 MB (every paragraph of each
+copy is tagged with a run id and the copy number so chunks are neither deduplicated
+nor served from the persistent chunk embedding store), splits it like an upload,
+and reports chunks/sec for:
+  - serial:    one embed_documents call over every chunk, no upload
+  - pipelined: VectorStoreService.add_texts with batched embedding and overlapped upserts
+
+The pipelined run writes to the configured RAG_BACKEND. Use RAG_BACKEND=local to
+keep Pinecone out of the measurement, and EMBED_PROCESSES / EMBED_BATCH_SIZE to
+compare encode settings.
+
+Usage:
+    RAG_BACKEND=local python bench_embedding.py --size-mb 1
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from debug_chunking import text as SAMPLE_TEXT
+from app.rag import split_chunks, vector_service, EMBED_BATCH_SIZE
+
+
+def build_text(size_bytes: int) -> str:
+    run = uuid.uuid4().hex[:8]
+    parts = []
+    total = 0
+    i = 0
+    while total < size_bytes:
+        part = SAMPLE_TEXT.replace("\n\n", f"\n\n[{run}-{i}] ") + "\n\n"
+        parts.append(part)
+        total += len(part.encode("utf-8"))
+        i += 1
+    return "".join(parts)
+
+
+async def main(size_mb: float, batch_size: int):
+    text = build_text(int(size_mb * 1024 * 1024))
+    chunks = split_chunks(text)
+    print(f"Text size:       {len(text.encode('utf-8')) / 1024:.0f} KB")
+    print(f"Chunks:          {len(chunks)}")
+    print(f"Backend:         {vector_service.backend}")
+
+    await vector_service.warm_up()
+
+    start = time.perf_counter()
+    await asyncio.to_thread(vector_service.document_embedder.embed_documents, chunks)
+    serial = time.perf_counter() - start
+    print(f"Serial embed:    {serial:.2f}s ({len(chunks) / serial:.0f} chunks/s)")
+
+    session_id = f"bench-{uuid.uuid4()}"
+    metadatas = [{"session_id": session_id} for _ in chunks]
+    start = time.perf_counter()
+    await vector_service.add_texts(chunks, metadatas=metadatas, batch_size=batch_size)
+    pipelined = time.perf_counter() - start
+    print(f"Pipelined index: {pipelined:.2f}s ({len(chunks) / pipelined:.0f} chunks/s, batch size {batch_size})")
+
+    vector_service.forget_session(session_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(main(args.size_mb, args.batch_size))
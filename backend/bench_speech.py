@@ -0,0 +1,78 @@
+"""
+Speech analytics micro-benchmark.
+
+Builds a synthetic Whisper transcript of the given length (segments of ~12 words with
+fillers, including multi-word ones, and occasional long pauses) and times
+app.speech_metrics.analyze_speech against the old per-word / per-segment Python loops.
+
+Usage:
+    python bench_speech.py --minutes 60
+"""
+import argparse
+import random
+import time
+
+from app.speech_metrics import analyze_speech
+
+WORDS = "the gradient of the loss tells us how to update each weight during training".split()
+FILLERS = ["um", "uh", "like", "you know", "sort of", "kind of"]
+
+
+def build_segments(minutes: float, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    while t < minutes * 60:
+        words = [rng.choice(WORDS) for _ in range(12)]
+        for _ in range(rng.randint(0, 2)):
+            words.insert(rng.randrange(len(words)), rng.choice(FILLERS))
+        length = len(words) * 0.4
+        segments.append({"start": round(t, 3), "end": round(t + length, 3), "text": " ".join(words)})
+        t += length + (rng.uniform(0.6, 3.0) if rng.random() < 0.2 else rng.uniform(0.0, 0.3))
+    return segments
+
+
+def loop_baseline(text: str, segments: list) -> dict:
+    # The speech agent's original approach
+    fillers = ["um", "uh", "ah", "like", "you know", "sort of", "kind of"]
+    words = text.lower().split()
+    hesitation_count = sum(1 for word in words if word.strip(".,!?") in fillers)
+    pause_duration_ms = 0
+    for i in range(len(segments) - 1):
+        gap = segments[i + 1]["start"] - segments[i]["end"]
+        if gap > 0.5:
+            pause_duration_ms += gap * 1000
+    return {"hesitation_count": hesitation_count, "pause_duration_ms": int(pause_duration_ms)}
+
+
+def bench(label: str, fn, repeat: int):
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+    print(f"{label:<28} {elapsed:8.2f} ms")
+    return result
+
+
+def main(minutes: float, repeat: int):
+    segments = build_segments(minutes)
+    text = " ".join(seg["text"] for seg in segments)
+    duration = segments[-1]["end"]
+    print(f"Transcript: {minutes:g} min, {len(segments)} segments, {len(text.split())} words")
+
+    old = bench("python loops (old)", lambda: loop_baseline(text, segments), repeat)
+    new = bench("analyze_speech", lambda: analyze_speech(text, segments, duration), repeat)
+    bench("analyze_speech per_segment", lambda: analyze_speech(text, segments, duration, per_segment=True), repeat)
+
+    print(f"Hesitations: old={old['hesitation_count']} (misses multi-word fillers), new={new['hesitation_count']}")
+    print(f"Pauses: {new['pause_count']} totalling {new['pause_duration_ms']} ms, "
+          f"wpm={new['wpm']}, articulation_wpm={new['articulation_wpm']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.minutes, args.repeat)
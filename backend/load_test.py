@@ -0,0 +1,103 @@
+"""
+Concurrent session load test for the viva API.
+
+Starts N sessions at once, answers each once, and probes /health while they run.
+If the graph blocks the event loop, the wall time approaches the SUM of the
+per-session latencies and /health stalls behind LLM calls. With async graph
+execution the wall time stays close to the slowest single session.
+Per-node timings from /api/metrics are printed at the end.
+
+Usage (server must be running):
+    python load_test.py --url http://localhost:8000 --sessions 8
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+SAMPLE_ANSWER = "REST is an architectural style where each request is stateless and resources are addressed by URLs."
+
+
+async def run_session(client: httpx.AsyncClient, idx: int, topic: str):
+    timings = {}
+
+    start = time.perf_counter()
+    resp = await client.post("/api/start", data={
+        "topic": topic,
+        "strictness": "Moderate",
+        "user_email": f"loadtest+{idx}@example.com",
+        "mode": "viva"
+    })
+    resp.raise_for_status()
+    timings["start"] = time.perf_counter() - start
+    session_id = resp.json()["session_id"]
+
+    start = time.perf_counter()
+    resp = await client.post("/api/answer", json={"session_id": session_id, "transcript": SAMPLE_ANSWER})
+    resp.raise_for_status()
+    timings["answer"] = time.perf_counter() - start
+
+    return timings
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.2)
+
+
+async def main(url: str, sessions: int, topic: str):
+    async with httpx.AsyncClient(base_url=url, timeout=300) as client:
+        stop = asyncio.Event()
+        health_samples = []
+        probe = asyncio.create_task(probe_health(client, stop, health_samples))
+
+        wall_start = time.perf_counter()
+        results = await asyncio.gather(
+            *(run_session(client, i, topic) for i in range(sessions)),
+            return_exceptions=True
+        )
+        wall = time.perf_counter() - wall_start
+
+        stop.set()
+        await probe
+
+        metrics = (await client.get("/api/metrics")).json()
+
+    ok = [r for r in results if isinstance(r, dict)]
+    failed = [r for r in results if not isinstance(r, dict)]
+    for err in failed:
+        print(f"Session failed: {err!r}")
+    if not ok:
+        return
+
+    per_session = [r["start"] + r["answer"] for r in ok]
+    total = sum(per_session)
+
+    print(f"Sessions:              {len(ok)} ok, {len(failed)} failed")
+    print(f"Wall time:             {wall:.2f}s")
+    print(f"Sum of session times:  {total:.2f}s")
+    print(f"Slowest session:       {max(per_session):.2f}s")
+    print(f"Avg /api/start:        {sum(r['start'] for r in ok) / len(ok):.2f}s")
+    print(f"Avg /api/answer:       {sum(r['answer'] for r in ok) / len(ok):.2f}s")
+    # ~1.0 means sessions overlap fully, ~N means they ran one after another
+    print(f"Serialization factor:  {wall / max(per_session):.2f} (1.0 = fully concurrent, {len(ok)} = serialized)")
+    if health_samples:
+        print(f"/health max latency:   {max(health_samples) * 1000:.0f}ms over {len(health_samples)} probes")
+
+    # Server-side per-node timings, run once with GRAPH_PARALLEL_FANOUT=0 to compare
+    print("Node timings (avg / max ms, since server start):")
+    for name, stats in sorted(metrics.get("nodes", {}).items()):
+        print(f"  {name:<22} {stats['avg_ms']:>8.0f} / {stats['max_ms']:.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--topic", default="REST APIs")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.sessions, args.topic))
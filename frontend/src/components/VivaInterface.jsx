@@ -8,6 +8,7 @@ const VivaInterface = ({ sessionData, onComplete, onBack }) => {
     const [currentQuestion, setCurrentQuestion] = useState(sessionData?.initial_question || 'Ready?');
     const [isRecording, setIsRecording] = useState(false);
     const [transcript, setTranscript] = useState('');
+    const [speech, setSpeech] = useState(null); // Whisper segments/words for the current transcript
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState('');
     const [recognition, setRecognition] = useState(null);
@@ -251,6 +252,7 @@ const VivaInterface = ({ sessionData, onComplete, onBack }) => {
 
     const startRecording = async () => {
         setTranscript('');
+        setSpeech(null);
         setError('');
         window.speechSynthesis.cancel();
 
@@ -327,6 +329,8 @@ const VivaInterface = ({ sessionData, onComplete, onBack }) => {
                     try {
                         const formData = new FormData();
                         formData.append("file", audioBlob, `recording.${extension}`);
+                        // Lets the server start looking up context for this answer before it is submitted
+                        formData.append("session_id", sessionData.session_id);
 
                         const response = await axios.post(`${API_BASE_URL}/api/transcribe`, formData, {
                             headers: { 'Content-Type': 'multipart/form-data' }
@@ -334,6 +338,7 @@ const VivaInterface = ({ sessionData, onComplete, onBack }) => {
 
                         if (response.data.transcript) {
                             setTranscript(response.data.transcript);
+                            setSpeech(response.data.speech || null);
                         } else {
                             setError("No speech returned from server.");
                         }
@@ -377,7 +382,8 @@ const VivaInterface = ({ sessionData, onComplete, onBack }) => {
         try {
             const response = await axios.post(`${API_BASE_URL}/api/answer`, {
                 session_id: sessionData.session_id,
-                transcript: transcript
+                transcript: transcript,
+                speech: speech
             });
 
             if (response.data.status === 'completed') {
@@ -385,6 +391,7 @@ const VivaInterface = ({ sessionData, onComplete, onBack }) => {
             } else {
                 setCurrentQuestion(response.data.current_question);
                 setTranscript('');
+                setSpeech(null);
             }
         } catch (err) {
             console.error(err);